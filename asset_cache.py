@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import pygame
+
+
+def premultiply_alpha(img):
+    # BGRA -> BGR 已乘上 alpha，貼圖時只要 bg * (1 - a) + fg
+    out = img.copy()
+    alpha = img[:, :, 3:4].astype(np.uint16)
+    out[:, :, :3] = (img[:, :, :3] * alpha + 127) // 255
+    return out
+
+
+def decode_image(path, size=None, flags=cv2.IMREAD_COLOR, keep_aspect=False,
+                 interpolation=cv2.INTER_AREA, premultiplied=False):
+    # 讀檔、縮放（size 為 (w, h)），需要時轉成 premultiplied alpha；失敗回傳 None
+    img = cv2.imread(path, flags)
+    if img is None:
+        return None
+    if size is not None:
+        if keep_aspect:
+            h, w = img.shape[:2]
+            scale = min(size[0] / w, size[1] / h)
+            target = (int(w * scale), int(h * scale))
+        else:
+            target = size
+        img = cv2.resize(img, target, interpolation=interpolation)
+    if premultiplied and img.ndim == 3 and img.shape[2] == 4:
+        img = premultiply_alpha(img)
+    return img
+
+
+class AssetCache:
+    """整個程式共用的素材快取：圖片與音效只解碼、縮放一次，依 LRU 淘汰"""
+
+    def __init__(self, budget_bytes=64 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (asset, nbytes)
+        self._lock = threading.RLock()
+        self.atlas = None             # 預先建好的 SpriteAtlas，第一次讀圖時才開啟
+        self._atlas_checked = False
+
+    def get(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        asset, nbytes = loader()
+        with self._lock:
+            # 其他執行緒可能已經先載入同一個 key
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            if nbytes > self.budget_bytes:
+                return asset  # 比整個預算還大就不留在快取
+            self._entries[key] = (asset, nbytes)
+            self.used_bytes += nbytes
+            self._evict()
+        return asset
+
+    def _evict(self):
+        while self.used_bytes > self.budget_bytes and len(self._entries) > 1:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.used_bytes -= nbytes
+            self.evictions += 1
+
+    def get_atlas(self):
+        with self._lock:
+            if not self._atlas_checked:
+                self._atlas_checked = True
+                from sprite_atlas import SpriteAtlas
+                self.atlas = SpriteAtlas.open_default()
+            return self.atlas
+
+    def load_image(self, path, size=None, flags=cv2.IMREAD_COLOR, keep_aspect=False,
+                   interpolation=cv2.INTER_AREA, premultiplied=False):
+        # size 為 (w, h)；keep_aspect=True 時視為最大框，等比例縮放
+        # premultiplied=True 時 BGRA 圖的顏色已乘上 alpha（atlas 裡存的就是這種）
+        # 回傳的陣列是唯讀共用的，要在上面畫圖請先 copy()
+        key = ('image', path, size, flags, keep_aspect, interpolation, premultiplied)
+
+        def loader():
+            atlas = self.get_atlas()
+            if atlas is not None:
+                img = atlas.lookup(path, size, flags, keep_aspect, interpolation, premultiplied)
+                if img is not None:
+                    return img, 0  # memmap 的頁面由作業系統管理，不算進快取預算
+            img = decode_image(path, size, flags, keep_aspect, interpolation, premultiplied)
+            if img is None:
+                return None, 0  # 載入失敗也記住，避免每幀重試
+            img.flags.writeable = False
+            return img, img.nbytes
+
+        return self.get(key, loader)
+
+    def load_sound(self, path):
+        # 失敗時丟出例外（與 pygame.mixer.Sound 相同），交給呼叫端處理
+        key = ('sound', path)
+
+        def loader():
+            sound = pygame.mixer.Sound(path)
+            freq, fmt, channels = pygame.mixer.get_init()
+            nbytes = int(sound.get_length() * freq * channels * (abs(fmt) // 8))
+            return sound, nbytes
+
+        return self.get(key, loader)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'used_bytes': self.used_bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
+
+
+# 大廳與三個遊戲共用的實例
+assets = AssetCache()
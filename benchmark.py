@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+
+# 不開視窗、不出聲音，必須在 import pygame 之前設定
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import cv2
+import numpy as np
+import pygame
+
+from display import HeadlessDisplay, PipelinedDisplay
+from input_events import InputEvent, InputQueue
+from surface_bridge import SurfaceBridge
+
+PHASES = ('update', 'render', 'blend', 'present')
+
+
+class PhaseTimer:
+    # 每幀記錄各階段耗時（秒）；render 不含 blend，四個階段加起來就是整幀
+    def __init__(self):
+        self.samples = {phase: [] for phase in PHASES}
+        self._blend = 0.0
+
+    def timed_blend(self, fn):
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._blend += time.perf_counter() - t0
+        return wrapper
+
+    def run_frames(self, frames, script, update, render, present):
+        for i in range(frames):
+            script(i)
+            t0 = time.perf_counter()
+            update()
+            t1 = time.perf_counter()
+            self._blend = 0.0
+            frame = render()
+            t2 = time.perf_counter()
+            present(frame)
+            t3 = time.perf_counter()
+            self.samples['update'].append(t1 - t0)
+            self.samples['render'].append(t2 - t1 - self._blend)
+            self.samples['blend'].append(self._blend)
+            self.samples['present'].append(t3 - t2)
+
+    def summary(self):
+        result = {}
+        for phase, values in self.samples.items():
+            ms = np.asarray(values) * 1000.0
+            result[phase] = {
+                'p50': float(np.percentile(ms, 50)),
+                'p95': float(np.percentile(ms, 95)),
+                'p99': float(np.percentile(ms, 99)),
+                'mean': float(ms.mean()),
+            }
+        return result
+
+
+def bench_whac(frames, timer, make_display, board='classic'):
+    from whac_a_mole import WhacAMole, GameMode, Difficulty
+    input_queue = InputQueue()
+    display = make_display(input_queue)
+    game = WhacAMole(board=board)
+    game.blit_sprites = timer.timed_blend(game.blit_sprites)
+    game.mode, game.difficulty = GameMode.DIFFICULTY, Difficulty.HARD
+    game.state, game.start_time = "game", time.time()
+
+    def script(i):
+        # 每 5 幀往隨機洞口揮一次槌子；玩完就重開，讓整段都在遊戲畫面
+        if game.state != "game":
+            game.state, game.score, game.lives = "game", 0, 3
+        x, y = random.choice(game.positions)
+        input_queue.on_mouse(cv2.EVENT_MOUSEMOVE, x, y - 40, 0, None)
+        if i % 5 == 0:
+            input_queue.on_mouse(cv2.EVENT_LBUTTONDOWN, x, y - 40, 0, None)
+        game.handle_events(input_queue.drain())
+
+    timer.run_frames(frames, script, game.timed_update, game.timed_render, display.present)
+    display.close()
+    return game
+
+
+def bench_taiko(frames, timer, make_display):
+    from taiko_drum import TaikoDrum
+    input_queue = InputQueue()
+    display = make_display(input_queue)
+    game = TaikoDrum(display=display, input_queue=input_queue)
+    game.blit_sprites = timer.timed_blend(game.blit_sprites)
+    game.set_difficulty('hard')
+    game.crush_mode = False
+    game.max_combo = 0
+
+    def script(i):
+        # 每 3 幀交替敲 A / L
+        if i % 3 == 0:
+            input_queue.push(InputEvent(pygame.KEYDOWN, key=ord('a') if (i // 3) % 2 == 0 else ord('l')))
+        game.handle_events(input_queue.drain())
+
+    timer.run_frames(frames, script, game.step, game.timed_render, display.present)
+    display.close()
+    return game
+
+
+def bench_piano(frames, timer, make_display):
+    from piano_12keys import Piano12Keys, WHITE_KEY_CODES
+    input_queue = InputQueue()
+    display = make_display(input_queue)
+    surface = pygame.Surface((800, 600), 0, 32)
+    bridge = SurfaceBridge()
+    to_bgr = timer.timed_blend(bridge.to_bgr)
+    game = Piano12Keys(surface)
+    game.metronome_on = True
+
+    def script(i):
+        # 每 4 幀按下一個白鍵，下一幀放開
+        key = WHITE_KEY_CODES[(i // 4) % len(WHITE_KEY_CODES)]
+        if i % 4 == 0:
+            input_queue.push(InputEvent(pygame.KEYDOWN, key=key))
+        elif i % 4 == 1:
+            input_queue.push(InputEvent(pygame.KEYUP, key=key))
+        game.handle_events(input_queue.drain())
+
+    def render():
+        surface.fill((60, 60, 60))
+        game.timed_render()
+        return to_bgr(surface)
+
+    timer.run_frames(frames, script, game.timed_update, render, display.present)
+    display.close()
+    return game
+
+
+BENCHMARKS = {
+    'whac': bench_whac,
+    'taiko': bench_taiko,
+    'piano': bench_piano,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="不開視窗跑各遊戲 N 幀，輸出各階段 p50/p95/p99 (ms)")
+    parser.add_argument('games', nargs='*', help="要跑的遊戲：" + ", ".join(BENCHMARKS) + "（預設全部）")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--pipelined', action='store_true', help="present 改由 presenter 執行緒處理")
+    parser.add_argument('--whac-board', default='classic', help="打地鼠的盤面：classic、large、huge 或 RxC")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.games if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的遊戲: {', '.join(unknown)}")
+    games = args.games or list(BENCHMARKS)
+
+    pipelines = []
+
+    def make_display(input_queue):
+        if not args.pipelined:
+            return HeadlessDisplay()
+        display = PipelinedDisplay(HeadlessDisplay(), input_queue)
+        display.open()
+        pipelines.append(display)
+        return display
+
+    pygame.init()
+    results = {}
+    for name in games:
+        random.seed(args.seed)
+        timer = PhaseTimer()
+        options = {'board': args.whac_board} if name == 'whac' else {}
+        game = BENCHMARKS[name](args.frames, timer, make_display, **options)
+        results[name] = timer.summary()
+        # 遊戲自己標記的區段（GameBase.span），平均每幀 ms
+        results[name]['spans'] = dict(game.profiler.top_spans(count=20))
+        if pipelines:
+            results[name]['pipeline'] = pipelines.pop().stats()
+        print(f"[{name}] " + "  ".join(
+            f"{phase} p50={s['p50']:.2f} p95={s['p95']:.2f} p99={s['p99']:.2f}"
+            for phase, s in results[name].items() if phase in PHASES))
+    pygame.quit()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'frames': args.frames,
+        'seed': args.seed,
+        'pipelined': args.pipelined,
+        'whac_board': args.whac_board,
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'machine': platform.machine(),
+        'unit': 'ms',
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"結果已寫入 {args.out}")
+
+
+if __name__ == '__main__':
+    main()
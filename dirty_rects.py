@@ -0,0 +1,70 @@
+import pygame
+
+
+class DirtyRenderer:
+    """髒矩形合成：畫面保留在 canvas 上，每幀只從背景還原有變動的區域，再重畫碰到這些區域的物件"""
+
+    def __init__(self):
+        self.canvas = None
+        self.background = None
+        self._prev = {}          # key -> (version, rect)，上一幀畫了什麼
+        self._forced = []        # 下一幀一定要還原的區域（例如被外部畫上去的效能面板）
+        self._full = True
+        self.dirty_pixels = 0    # 上一幀還原的像素數（重疊的部分會重複計算）
+        self.redrawn = 0         # 上一幀重畫的物件數
+
+    def invalidate(self, rect=None):
+        # 不給 rect 就是下一幀整張重畫
+        if rect is None:
+            self._full = True
+        else:
+            self._forced.append(pygame.Rect(rect))
+
+    def render(self, background, items):
+        # items: 依畫的順序（後面的蓋在前面）排列的 (key, version, rect, draw)
+        # version 或 rect 跟上一幀不同的物件，新舊兩個位置都要還原；draw(canvas) 負責畫出物件
+        if self.canvas is None or self.background is not background or self.canvas.shape != background.shape:
+            self.canvas = background.copy()
+            self.background = background
+            self._full = True
+        bounds = pygame.Rect(0, 0, background.shape[1], background.shape[0])
+        current = {}
+        rects = []
+        for key, version, rect, _ in items:
+            rect = pygame.Rect(rect).clip(bounds)
+            current[key] = (version, rect)
+            rects.append(rect)
+        if self._full:
+            self.canvas[:] = background
+            redraw = [True] * len(items)
+            self.dirty_pixels = bounds.w * bounds.h
+        else:
+            dirty = [r for r in self._forced]
+            for key, state in self._prev.items():
+                if current.get(key) != state:
+                    dirty.append(state[1])
+            for key, state in current.items():
+                if self._prev.get(key) != state:
+                    dirty.append(state[1])
+            dirty = [r for r in dirty if r.w > 0 and r.h > 0]
+            # 沒變的物件只要碰到髒區域，也要整個還原再重畫，半透明的邊緣才不會疊兩次
+            redraw = [False] * len(items)
+            changed = True
+            while changed:
+                changed = False
+                for i, rect in enumerate(rects):
+                    if not redraw[i] and rect.collidelist(dirty) >= 0:
+                        redraw[i] = True
+                        dirty.append(rect)
+                        changed = True
+            for r in dirty:
+                self.canvas[r.top:r.bottom, r.left:r.right] = background[r.top:r.bottom, r.left:r.right]
+            self.dirty_pixels = sum(r.w * r.h for r in dirty)
+        for i, (_, _, _, draw) in enumerate(items):
+            if redraw[i]:
+                draw(self.canvas)
+        self.redrawn = sum(redraw)
+        self._prev = current
+        self._forced = []
+        self._full = False
+        return self.canvas
@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+WINDOW_NAME = "MultiMedia Game"
+
+
+class CvDisplay:
+    """實際的 OpenCV 視窗"""
+
+    interactive = True
+
+    def __init__(self, window_name=WINDOW_NAME):
+        self.window_name = window_name
+
+    def open(self):
+        cv2.namedWindow(self.window_name)
+
+    def present(self, frame):
+        cv2.imshow(self.window_name, frame)
+
+    def wait_key(self, delay_ms):
+        return cv2.waitKey(delay_ms) & 0xFF
+
+    def poll_key(self):
+        # 不等待，只取出已經到達的按鍵
+        return cv2.pollKey() & 0xFF
+
+    def set_mouse_callback(self, callback):
+        cv2.setMouseCallback(self.window_name, callback)
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+class HeadlessDisplay:
+    """不開視窗：畫面收進 numpy ring buffer，按鍵與滑鼠由程式注入"""
+
+    interactive = False  # 沒有真人輸入，等待按鍵的畫面不該一直等下去
+
+    def __init__(self, capacity=8):
+        self.capacity = capacity
+        self.frames = None      # (capacity, h, w, 3)
+        self.frame_count = 0
+        self.keys = deque()
+        self.mouse_callback = None
+
+    def open(self):
+        pass
+
+    def present(self, frame):
+        if self.frames is None or self.frames.shape[1:] != frame.shape:
+            self.frames = np.empty((self.capacity,) + frame.shape, dtype=frame.dtype)
+        np.copyto(self.frames[self.frame_count % self.capacity], frame)
+        self.frame_count += 1
+
+    def last_frame(self):
+        if self.frame_count == 0:
+            return None
+        return self.frames[(self.frame_count - 1) % self.capacity]
+
+    def push_key(self, key):
+        self.keys.append(key & 0xFF)
+
+    def wait_key(self, delay_ms):
+        # 不真的等待，有注入的按鍵就一次回傳一個
+        return self.keys.popleft() if self.keys else 255
+
+    def poll_key(self):
+        return self.wait_key(0)
+
+    def set_mouse_callback(self, callback):
+        self.mouse_callback = callback
+
+    def mouse(self, event, x, y, flags=0):
+        if self.mouse_callback is not None:
+            self.mouse_callback(event, x, y, flags, None)
+
+    def close(self):
+        pass
+
+
+class PipelinedDisplay:
+    """管線模式：遊戲執行緒只把畫面放進緩衝槽，另一條執行緒負責 imshow 與收集輸入"""
+
+    collects_input = True
+
+    def __init__(self, inner, input_queue, slots=3):
+        self.inner = inner
+        self.interactive = getattr(inner, 'interactive', True)
+        self.input_queue = input_queue
+        self.slots = slots            # 含 presenter 正在顯示的那一格
+        self.presented = 0
+        self.dropped = 0
+        self.max_queue_depth = 0
+        self._pending = deque()       # 等待顯示的畫面
+        self._free = []               # 可以重複使用的緩衝
+        self._cond = threading.Condition()
+        self._mouse_callback = None
+        self._callback_changed = False
+        self._running = False
+        self._thread = None
+
+    def open(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="presenter", daemon=True)
+        self._thread.start()
+
+    def present(self, frame):
+        with self._cond:
+            buf = None
+            while self._free and buf is None:
+                candidate = self._free.pop()
+                if candidate.shape == frame.shape and candidate.dtype == frame.dtype:
+                    buf = candidate
+        if buf is None:
+            buf = np.empty_like(frame)
+        np.copyto(buf, frame)
+        with self._cond:
+            # presenter 跟不上時丟掉最舊的畫面，遊戲執行緒不會被卡住
+            while len(self._pending) >= self.slots - 1:
+                self._free.append(self._pending.popleft())
+                self.dropped += 1
+            self._pending.append(buf)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+            self._cond.notify()
+
+    @property
+    def queue_depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def wait_input(self, delay_ms):
+        time.sleep(max(delay_ms, 1) / 1000.0)
+
+    def wait_key(self, delay_ms):
+        # 按鍵由 presenter 執行緒送進 input_queue，這裡不會拿到
+        self.wait_input(delay_ms)
+        return 255
+
+    def poll_key(self):
+        return 255
+
+    def set_mouse_callback(self, callback):
+        with self._cond:
+            self._mouse_callback = callback
+            self._callback_changed = True
+            self._cond.notify()
+
+    def _run(self):
+        # OpenCV 的視窗、imshow、waitKey 與滑鼠 callback 都在這條執行緒上
+        self.inner.open()
+        while self._running:
+            with self._cond:
+                if not self._pending and not self._callback_changed:
+                    self._cond.wait(timeout=0.005)
+                frame = self._pending.popleft() if self._pending else None
+                callback = self._mouse_callback if self._callback_changed else None
+                self._callback_changed = False
+            if callback is not None:
+                self.inner.set_mouse_callback(callback)
+            if frame is not None:
+                self.inner.present(frame)
+                with self._cond:
+                    self._free.append(frame)
+                    self.presented += 1
+            self.input_queue.poll(self.inner, 1)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queue_depth': len(self._pending),
+                'max_queue_depth': self.max_queue_depth,
+                'presented': self.presented,
+                'dropped': self.dropped,
+            }
+
+    def close(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.inner.close()
@@ -0,0 +1,83 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+
+class FrameProfiler:
+    """記錄每幀耗時與具名區段（span），並可在畫面上畫出效能 HUD"""
+
+    def __init__(self, history=120, clock=time.perf_counter):
+        self.history = history
+        self.clock = clock
+        self.frame_times = deque(maxlen=history)   # 兩次 render 之間的秒數
+        self.span_history = {}                     # name -> deque(每幀累計秒數)
+        self._current = {}
+        self._last_frame = None
+        self.overlay_enabled = False
+
+    @contextmanager
+    def span(self, name):
+        t0 = self.clock()
+        try:
+            yield
+        finally:
+            self._current[name] = self._current.get(name, 0.0) + self.clock() - t0
+
+    def end_frame(self):
+        now = self.clock()
+        if self._last_frame is not None:
+            self.frame_times.append(now - self._last_frame)
+        self._last_frame = now
+        for name in set(self.span_history) | set(self._current):
+            totals = self.span_history.get(name)
+            if totals is None:
+                totals = self.span_history[name] = deque(maxlen=self.history)
+            totals.append(self._current.get(name, 0.0))
+        self._current.clear()
+
+    def fps(self):
+        total = sum(self.frame_times)
+        return len(self.frame_times) / total if total > 0 else 0.0
+
+    def top_spans(self, count=5):
+        # 依最近幾幀的平均耗時排序，回傳 [(name, ms), ...]
+        means = [(name, 1000.0 * sum(t) / len(t)) for name, t in self.span_history.items() if t]
+        means.sort(key=lambda item: item[1], reverse=True)
+        return means[:count]
+
+    def panel_rect(self, frame, width=240, graph_h=40, line_h=18):
+        # 面板在畫面右下角的 (x, y, w, h)
+        height = 30 + graph_h + 10 + line_h * len(self.top_spans())
+        return frame.shape[1] - width - 10, frame.shape[0] - height - 10, width, height
+
+    def draw(self, frame, width=240, graph_h=40, budget_ms=1000.0 / 60):
+        spans = self.top_spans()
+        line_h = 18
+        x0, y0, _, height = self.panel_rect(frame, width, graph_h, line_h)
+        if x0 < 0 or y0 < 0:
+            return frame
+        roi = frame[y0:y0 + height, x0:x0 + width]
+        cv2.addWeighted(roi, 0.35, np.zeros_like(roi), 0.65, 0, roi)
+        times = np.asarray(self.frame_times) * 1000.0
+        worst = times.max() if len(times) else 0.0
+        cv2.putText(frame, f"FPS {self.fps():5.1f}  max {worst:5.1f}ms", (x0 + 6, y0 + 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+        # 幀時間折線圖，黃線是 60 FPS 的預算
+        gy = y0 + 30
+        scale = graph_h / max(worst, budget_ms * 2)
+        budget_y = int(gy + graph_h - budget_ms * scale)
+        cv2.line(frame, (x0 + 6, budget_y), (x0 + width - 6, budget_y), (0, 200, 255), 1)
+        if len(times) > 1:
+            xs = np.linspace(x0 + 6, x0 + width - 6, len(times))
+            ys = gy + graph_h - times * scale
+            points = np.stack([xs, ys], axis=1).astype(np.int32)
+            cv2.polylines(frame, [points], False, (0, 255, 0), 1, cv2.LINE_AA)
+        y = gy + graph_h + 10
+        for name, ms in spans:
+            y += line_h
+            cv2.putText(frame, f"{name[:20]:<20} {ms:6.2f}ms", (x0 + 6, y - 4),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, (220, 220, 220), 1, cv2.LINE_AA)
+        return frame
@@ -1,13 +1,76 @@
+import pygame
+
+from frame_profiler import FrameProfiler
+from sprite_blit import blit_many
+
+PERF_OVERLAY_KEY = ord('`')  # 切換效能 HUD
+
 
 class GameBase:
+    # GameLoop 以固定 tick 呼叫 update()，子類別可依需要覆寫
+    tick_rate = 60
+
     def __init__(self, name):
         self.name = name
+        self.profiler = FrameProfiler()
 
     def handle_event(self, event):
         pass
 
+    def handle_events(self, events):
+        # 一幀內收到的事件整批送進來，預設逐一交給 handle_event
+        for event in events:
+            self.handle_event(event)
+
     def update(self):
         pass
 
     def render(self, frame):
         pass
+
+    def blit_sprites(self, frame, sprite, positions, height=None):
+        # 各遊戲共用的 premultiplied alpha 貼圖，見 sprite_blit
+        return blit_many(frame, sprite, positions, height)
+
+    # --- 生命週期：實例會在大廳與遊戲之間重複使用，素材只在 __init__ 載入一次 ---
+    def reset_session(self):
+        # 子類別覆寫：只重設分數、狀態這類「這一局」的資料
+        pass
+
+    def resume(self):
+        # 從大廳進入遊戲時呼叫
+        self.reset_session()
+
+    def suspend(self):
+        # 按 ESC 回大廳時呼叫：停音樂等，已載入的素材保留
+        pass
+
+    # --- 效能量測：主迴圈透過這些包裝呼叫生命週期方法 ---
+    def span(self, name):
+        # 遊戲內可以用 with self.span("..."): 量測自己的區段
+        return self.profiler.span(name)
+
+    def timed_handle_events(self, events):
+        remaining = []
+        for event in events:
+            if getattr(event, 'type', None) == pygame.KEYDOWN and getattr(event, 'key', None) == PERF_OVERLAY_KEY:
+                self.profiler.overlay_enabled = not self.profiler.overlay_enabled
+            else:
+                remaining.append(event)
+        with self.span("events"):
+            self.handle_events(remaining)
+
+    def timed_update(self):
+        with self.span("update"):
+            self.update()
+
+    def timed_render(self, *args):
+        with self.span("render"):
+            frame = self.render(*args)
+        self.profiler.end_frame()
+        return frame
+
+    def draw_perf_overlay(self, frame):
+        if self.profiler.overlay_enabled and frame is not None:
+            self.profiler.draw(frame)
+        return frame
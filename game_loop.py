@@ -0,0 +1,61 @@
+import time
+
+DEFAULT_TICK_RATE = 60   # 每秒模擬次數
+DEFAULT_TARGET_FPS = 60  # 每秒畫面更新次數
+MAX_SKIP_TICKS = 5       # 每畫一幀之前最多補跑幾次 update
+
+
+class GameLoop:
+    """固定時間步長排程：update 以固定 tick 前進，render 依 target_fps 獨立更新"""
+
+    def __init__(self, tick_rate=DEFAULT_TICK_RATE, target_fps=DEFAULT_TARGET_FPS,
+                 max_skip_ticks=MAX_SKIP_TICKS, clock=time.perf_counter):
+        self.tick = 1.0 / tick_rate
+        self.render_interval = 1.0 / target_fps
+        self.max_skip_ticks = max_skip_ticks
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        # 進入遊戲時呼叫，避免把待在大廳或選單的時間也拿來補 tick
+        now = self.clock()
+        self.last_time = now
+        self.accumulator = 0.0
+        self.next_render = now
+        self.ticks = 0
+        self.frames = 0
+        self.dropped_ticks = 0
+
+    def run_updates(self, update):
+        now = self.clock()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        steps = 0
+        while self.accumulator >= self.tick and steps < self.max_skip_ticks:
+            update()
+            self.accumulator -= self.tick
+            steps += 1
+        if self.accumulator >= self.tick:
+            # 落後太多時放棄追不上的時間，避免越補越慢
+            dropped = int(self.accumulator // self.tick)
+            self.accumulator -= dropped * self.tick
+            self.dropped_ticks += dropped
+        self.ticks += steps
+        return steps
+
+    def should_render(self):
+        now = self.clock()
+        if now < self.next_render:
+            return False
+        self.next_render += self.render_interval
+        if self.next_render < now:
+            self.next_render = now + self.render_interval
+        self.frames += 1
+        return True
+
+    def wait_ms(self):
+        # 給 cv2.waitKey 的等待時間：等到下一次 tick 或 render，至少 1ms 讓視窗處理事件
+        now = self.clock()
+        next_tick = self.last_time + self.tick - self.accumulator
+        remaining = min(next_tick, self.next_render) - now
+        return max(1, int(remaining * 1000))
@@ -0,0 +1,45 @@
+import numpy as np
+
+HIT_ALPHA = 64  # alpha 至少這麼多才算點到；半透明的柔邊不算
+
+
+class HitMask:
+    """每個像素 1 bit 的點擊遮罩（np.packbits 壓縮），座標相對於圖片左上角"""
+
+    __slots__ = ('bits', 'w', 'h')
+
+    def __init__(self, image, threshold=HIT_ALPHA):
+        self.h, self.w = image.shape[:2]
+        if image.ndim == 3 and image.shape[2] == 4:
+            solid = image[:, :, 3] >= threshold
+        else:
+            solid = np.ones((self.h, self.w), dtype=bool)
+        # 每列 ceil(w / 8) 個 byte，最高位元是最左邊的像素
+        self.bits = np.packbits(solid, axis=1)
+
+    def contains(self, x, y):
+        if 0 <= x < self.w and 0 <= y < self.h:
+            return bool(self.bits[y, x >> 3] & (0x80 >> (x & 7)))
+        return False
+
+
+class HoleGrid:
+    """洞口的均勻格狀索引：每一格記下外框碰得到這一格的洞，點擊時只查滑鼠所在的那一格"""
+
+    def __init__(self, positions, reach, cell_size=None):
+        # reach: 相對於洞口錨點、涵蓋所有動畫格的外框 (dx, dy, w, h)
+        # 格子預設和 reach 一樣大，每個洞最多落在 4 格裡
+        dx, dy, w, h = reach
+        self.cell_w, self.cell_h = cell_size or (max(w, 1), max(h, 1))
+        cells = {}
+        for i, (x, y) in enumerate(positions):
+            x0, y0 = x + dx, y + dy
+            for cy in range(y0 // self.cell_h, (y0 + h - 1) // self.cell_h + 1):
+                for cx in range(x0 // self.cell_w, (x0 + w - 1) // self.cell_w + 1):
+                    cells.setdefault((cx, cy), []).append(i)
+        # 後面的洞畫在上面，所以倒過來排，先檢查最上層的
+        self.cells = {key: tuple(reversed(holes)) for key, holes in cells.items()}
+
+    def candidates(self, x, y):
+        # (x, y) 可能點到的洞（索引），沒有就是空 tuple
+        return self.cells.get((x // self.cell_w, y // self.cell_h), ())
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import pygame
+
+NO_KEY = 255
+KEY_RELEASE_DELAY = 0.04  # 秒；OpenCV 沒有 key-up，超過這段時間沒再回報就視為放開
+
+
+class InputEvent:
+    # 欄位沿用 pygame event 的名稱，遊戲的 handle_event 可以直接吃
+    __slots__ = ('type', 'key', 'pos', 'button', 'time')
+
+    def __init__(self, type_, key=None, pos=None, button=None, time_=None):
+        self.type = type_
+        self.key = key
+        self.pos = pos
+        self.button = button
+        self.time = time.perf_counter() if time_ is None else time_
+
+
+def event_ticks(event):
+    # 把事件的 perf_counter 時間換成 pygame.time.get_ticks() 的毫秒刻度
+    if getattr(event, 'time', None) is None:
+        return pygame.time.get_ticks()
+    return int(pygame.time.get_ticks() - (time.perf_counter() - event.time) * 1000)
+
+
+class InputQueue:
+    """收集鍵盤與滑鼠事件（含時間戳），每幀整批交給遊戲"""
+
+    MOUSE_EVENTS = {
+        cv2.EVENT_MOUSEMOVE: (pygame.MOUSEMOTION, None),
+        cv2.EVENT_LBUTTONDOWN: (pygame.MOUSEBUTTONDOWN, 1),
+        cv2.EVENT_LBUTTONUP: (pygame.MOUSEBUTTONUP, 1),
+        cv2.EVENT_RBUTTONDOWN: (pygame.MOUSEBUTTONDOWN, 3),
+        cv2.EVENT_RBUTTONUP: (pygame.MOUSEBUTTONUP, 3),
+    }
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._held_lock = threading.Lock()
+        self.held_keys = {}  # key -> 最後一次被回報的時間
+
+    def push(self, event):
+        with self._lock:
+            self._events.append(event)
+
+    def on_mouse(self, event, x, y, flags, param):
+        # 給 setMouseCallback 用：只排進佇列，不直接改遊戲狀態
+        mapped = self.MOUSE_EVENTS.get(event)
+        if mapped is not None:
+            type_, button = mapped
+            self.push(InputEvent(type_, pos=(x, y), button=button, time_=self.clock()))
+
+    def poll(self, display, wait_ms):
+        if getattr(display, 'collects_input', False):
+            # 管線模式下由 presenter 執行緒收集輸入，這裡只需要等待
+            display.wait_input(wait_ms)
+            return
+        # 先等待第一個按鍵，再把同一幀內其他已經到達的按鍵全部取出
+        key = display.wait_key(wait_ms)
+        with self._held_lock:
+            seen = set()
+            while key != NO_KEY:
+                now = self.clock()
+                if key not in self.held_keys:
+                    self.push(InputEvent(pygame.KEYDOWN, key=key, time_=now))
+                self.held_keys[key] = now
+                seen.add(key)
+                key = display.poll_key()
+            now = self.clock()
+            for held, last_seen in list(self.held_keys.items()):
+                if held not in seen and now - last_seen >= KEY_RELEASE_DELAY:
+                    self.push(InputEvent(pygame.KEYUP, key=held, time_=last_seen))
+                    del self.held_keys[held]
+
+    def release_all(self):
+        # 離開遊戲時把還按著的鍵都補上 KEYUP
+        with self._held_lock:
+            now = self.clock()
+            for held in self.held_keys:
+                self.push(InputEvent(pygame.KEYUP, key=held, time_=now))
+            self.held_keys.clear()
+
+    def pop(self):
+        # 取出最早的一個事件，其餘的留在佇列裡；沒有事件時回傳 None
+        with self._lock:
+            return self._events.popleft() if self._events else None
+
+    def drain(self):
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+        with self._held_lock:
+            self.held_keys.clear()
@@ -1,3 +1,5 @@
+import sys
+
 import cv2
 import numpy as np
 import pygame
@@ -9,21 +11,39 @@ pygame.display.flip = lambda: None  # 讓 flip 變成 no-op，避免未 set_mode
 # from taiko_drum import TaikoDrum
 # from piano_12keys import Piano12Keys
 from whac_a_mole import MoleState
+from mole_board import parse_board
+from asset_cache import assets
+from surface_bridge import SurfaceBridge
+from game_loop import GameLoop, DEFAULT_TARGET_FPS
+from display import CvDisplay, PipelinedDisplay, WINDOW_NAME
+from input_events import InputQueue
 
-WINDOW_NAME = "MultiMedia Game"
 SCREEN_SIZE = (800, 600)
+TARGET_FPS = DEFAULT_TARGET_FPS
+LOBBY_WAIT_MS = 30
+# 加上 --pipelined 啟動時，imshow 與輸入收集改由另一條執行緒負責
+PIPELINED_PRESENT = "--pipelined" in sys.argv
+# 打地鼠的盤面：--whac-board=large、--whac-board=5x7 等，預設經典 3x3
+WHAC_BOARD = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--whac-board=")), "classic")
+try:
+    parse_board(WHAC_BOARD)  # 啟動時就檢查，打錯字不要等到背景載入或進遊戲才出錯
+except ValueError as e:
+    print(f"警告：{e}，改用 classic")
+    WHAC_BOARD = "classic"
 
 # 初始化 OpenCV 畫布
 blank_bg = lambda: np.ones((SCREEN_SIZE[1], SCREEN_SIZE[0], 3), dtype=np.uint8) * 30
 
 # 新增：建立一個 pygame Surface 給 Piano12Keys 用
-piano_surface = pygame.Surface(SCREEN_SIZE)
+piano_surface = pygame.Surface(SCREEN_SIZE, 0, 32)
+piano_bridge = SurfaceBridge()  # 直接讀 piano_surface 的 pixel buffer 轉成 BGR
 
 games = {
-    "1. Whac-A-Mole": None,  # 延遲初始化
-    "2. Taiko Drum": None,  # 進入時再根據難度建立
-    "3. 12-Key Piano": None  # 延遲初始化
+    "1. Whac-A-Mole": None,  # 由 preloader 在大廳閒置時建立，之後重複使用
+    "2. Taiko Drum": None,
+    "3. 12-Key Piano": None
 }
+GAME_KEYS = {ord('1'): "1. Whac-A-Mole", ord('2'): "2. Taiko Drum", ord('3'): "3. 12-Key Piano"}
 current_game = None
 font = cv2.FONT_HERSHEY_SIMPLEX
 
@@ -32,14 +52,13 @@ def draw_rounded_rect(img, top_left, bottom_right, radius, color, thickness=-1):
     x1, y1 = top_left
     x2, y2 = bottom_right
     if thickness < 0:
-        overlay = img.copy()
-        cv2.rectangle(overlay, (x1 + radius, y1), (x2 - radius, y2), color, -1)
-        cv2.rectangle(overlay, (x1, y1 + radius), (x2, y2 - radius), color, -1)
-        cv2.circle(overlay, (x1 + radius, y1 + radius), radius, color, -1)
-        cv2.circle(overlay, (x2 - radius, y1 + radius), radius, color, -1)
-        cv2.circle(overlay, (x1 + radius, y2 - radius), radius, color, -1)
-        cv2.circle(overlay, (x2 - radius, y2 - radius), radius, color, -1)
-        cv2.addWeighted(overlay, 1, img, 0, 0, img)
+        # 不透明填色直接畫在 img 上，不需要整張 copy + addWeighted
+        cv2.rectangle(img, (x1 + radius, y1), (x2 - radius, y2), color, -1)
+        cv2.rectangle(img, (x1, y1 + radius), (x2, y2 - radius), color, -1)
+        cv2.circle(img, (x1 + radius, y1 + radius), radius, color, -1)
+        cv2.circle(img, (x2 - radius, y1 + radius), radius, color, -1)
+        cv2.circle(img, (x1 + radius, y2 - radius), radius, color, -1)
+        cv2.circle(img, (x2 - radius, y2 - radius), radius, color, -1)
     else:
         cv2.rectangle(img, (x1 + radius, y1), (x2 - radius, y2), color, thickness)
         cv2.rectangle(img, (x1, y1 + radius), (x2, y2 - radius), color, thickness)
@@ -49,16 +68,14 @@ def draw_rounded_rect(img, top_left, bottom_right, radius, color, thickness=-1):
         cv2.ellipse(img, (x2 - radius, y2 - radius), (radius, radius), 0, 0, 90, color, thickness)
 
 
-def show_lobby():
-    # 嘗試載入 main_bg.png 作為主選單背景
-    bg_img = cv2.imread("main_bg.png")
-    if bg_img is not None:
-        img = cv2.resize(bg_img, SCREEN_SIZE)
-    else:
-        img = blank_bg()
-    button_width, button_height = 350, 70
+class LobbyView:
+    # 大廳畫面只在 hover、視窗大小或遊戲清單改變時重畫，其餘時間直接回傳快取
+    font_scale = 0.8
+    font_thickness = 2
+    padding_x = 32
+    padding_y = 16
     spacing = 40
-    labels = list(games.keys())
+    y_start = 180
     # 個別設定每個按鈕的位置偏移
     button_positions = [
         # (x_offset, y_offset)
@@ -67,157 +84,215 @@ def show_lobby():
         (40, 110),     # 2. Taiko Drum
         (250, 165),    # 3. 12-Key Piano
     ]
-    # 個別設定每個按鈕的寬高（以裝得下文字為前提）
-    button_sizes = []
-    font_scale = 0.8
-    font_thickness = 2
-    padding_x = 32
-    padding_y = 16
-    for label in labels:
-        text_size, _ = cv2.getTextSize(label, font, font_scale, font_thickness)
-        w = text_size[0] + padding_x * 2
-        h = text_size[1] + padding_y * 2
-        button_sizes.append((w, h))
-    y_start = 180
-    for i, label in enumerate(labels):
-        button_width, button_height = button_sizes[i]
-        x = (SCREEN_SIZE[0] - button_width) // 2 + button_positions[i][0]
-        y = y_start + i * (button_height + spacing) + button_positions[i][1]
-        # 黑底白字
-        color = (0, 0, 0)
-        self_text_color = (255, 255, 255)
-        draw_rounded_rect(img, (x, y), (x + button_width, y + button_height), 15, color)
-        text_size, _ = cv2.getTextSize(label, font, font_scale, font_thickness)
-        text_x = x + (button_width - text_size[0]) // 2
-        text_y = y + (button_height + text_size[1]) // 2
-        cv2.putText(img, label, (text_x, text_y), font, font_scale, self_text_color, font_thickness)
-    # ESC to quit 也用黑底白字，並自動根據文字大小決定背景大小
-    esc_text = "ESC to quit"
-    esc_font_scale = 0.8
-    esc_font_thickness = 2
-    esc_padding_x = 32
-    esc_padding_y = 16
-    (esc_text_size, _) = cv2.getTextSize(esc_text, font, esc_font_scale, esc_font_thickness)
-    esc_w2 = esc_text_size[0] + esc_padding_x * 2
-    esc_h2 = esc_text_size[1] + esc_padding_y * 2
-    esc_x = SCREEN_SIZE[0] - esc_w2 - 50  # 右邊留 50px 邊距
-    esc_y = 30  # 上方留 30px 邊距
-    color = (0, 0, 0)
-    self_text_color = (255, 255, 255)
-    draw_rounded_rect(img, (esc_x, esc_y), (esc_x + esc_w2, esc_y + esc_h2), 15, color)
-    text_x = esc_x + (esc_w2 - esc_text_size[0]) // 2
-    text_y = esc_y + (esc_h2 + esc_text_size[1]) // 2
-    cv2.putText(img, esc_text, (text_x, text_y), font, esc_font_scale, self_text_color, esc_font_thickness)
-    cv2.imshow(WINDOW_NAME, img)
+    button_color = (0, 0, 0)
+    hover_color = (70, 70, 70)
+    text_color = (255, 255, 255)
+
+    def __init__(self):
+        self.frame = None
+        self.cache_key = None
+        self.hover_index = None
+        self.button_rects = []  # (x, y, w, h)，與 games 的順序相同
+
+    def handle_event(self, event):
+        if event.pos is None:
+            return
+        x, y = event.pos
+        hover = None
+        for i, (bx, by, bw, bh) in enumerate(self.button_rects):
+            if bx <= x <= bx + bw and by <= y <= by + bh:
+                hover = i
+                break
+        self.hover_index = hover
+
+    def invalidate(self):
+        self.cache_key = None
+
+    def get_frame(self):
+        key = (SCREEN_SIZE, tuple(games.keys()), self.hover_index)
+        if key != self.cache_key:
+            self.frame = self.compose()
+            self.cache_key = key
+        return self.frame
+
+    def compose(self):
+        # 嘗試載入 main_bg.png 作為主選單背景
+        bg_img = assets.load_image("main_bg.png", SCREEN_SIZE, interpolation=cv2.INTER_LINEAR)
+        if bg_img is not None:
+            img = bg_img.copy()
+        else:
+            img = blank_bg()
+        labels = list(games.keys())
+        self.button_rects = []
+        for i, label in enumerate(labels):
+            # 個別設定每個按鈕的寬高（以裝得下文字為前提）
+            text_size, _ = cv2.getTextSize(label, font, self.font_scale, self.font_thickness)
+            button_width = text_size[0] + self.padding_x * 2
+            button_height = text_size[1] + self.padding_y * 2
+            x_offset, y_offset = self.button_positions[i] if i < len(self.button_positions) else (0, 0)
+            x = (SCREEN_SIZE[0] - button_width) // 2 + x_offset
+            y = self.y_start + i * (button_height + self.spacing) + y_offset
+            self.button_rects.append((x, y, button_width, button_height))
+            # 黑底白字，滑鼠移上去時稍微變亮
+            color = self.hover_color if i == self.hover_index else self.button_color
+            draw_rounded_rect(img, (x, y), (x + button_width, y + button_height), 15, color)
+            text_x = x + (button_width - text_size[0]) // 2
+            text_y = y + (button_height + text_size[1]) // 2
+            cv2.putText(img, label, (text_x, text_y), font, self.font_scale, self.text_color, self.font_thickness)
+        # ESC to quit 也用黑底白字，並自動根據文字大小決定背景大小
+        esc_text = "ESC to quit"
+        (esc_text_size, _) = cv2.getTextSize(esc_text, font, self.font_scale, self.font_thickness)
+        esc_w2 = esc_text_size[0] + self.padding_x * 2
+        esc_h2 = esc_text_size[1] + self.padding_y * 2
+        esc_x = SCREEN_SIZE[0] - esc_w2 - 50  # 右邊留 50px 邊距
+        esc_y = 30  # 上方留 30px 邊距
+        draw_rounded_rect(img, (esc_x, esc_y), (esc_x + esc_w2, esc_y + esc_h2), 15, self.button_color)
+        text_x = esc_x + (esc_w2 - esc_text_size[0]) // 2
+        text_y = esc_y + (esc_h2 + esc_text_size[1]) // 2
+        cv2.putText(img, esc_text, (text_x, text_y), font, self.font_scale, self.text_color, self.font_thickness)
+        return img
+
+
+lobby = LobbyView()
+input_queue = InputQueue()
+if PIPELINED_PRESENT:
+    display = PipelinedDisplay(CvDisplay(WINDOW_NAME), input_queue)
+else:
+    display = CvDisplay(WINDOW_NAME)
+
+
+def create_game(name):
+    # 各遊戲模組延遲 import，第一次建立時才載入
+    if name == "1. Whac-A-Mole":
+        from whac_a_mole import WhacAMole
+        return WhacAMole(board=WHAC_BOARD)
+    if name == "2. Taiko Drum":
+        from taiko_drum import TaikoDrum
+        return TaikoDrum(display=display, input_queue=input_queue)
+    from piano_12keys import Piano12Keys
+    return Piano12Keys(piano_surface)
+
+
+class GamePreloader:
+    """大廳閒置時依序建立遊戲實例（解碼圖片、載入音效），每次最多建一個"""
+
+    # 一律在主執行緒建立：遊戲建構時會開 pygame 字型（SDL_ttf）與音效（SDL_mixer），
+    # 這兩個函式庫都沒有保證可以跨執行緒使用；最花時間的也正是 mixer.Sound 的解碼與重新取樣，
+    # 沒辦法只把 pygame 以外的部分搬到背景執行緒
+    def __init__(self, names):
+        self.pending = list(names)
+
+    def step(self):
+        # 大廳沒有輸入的那一圈呼叫：建一個還沒建好的遊戲，大廳最多頓一下
+        while self.pending:
+            name = self.pending.pop(0)
+            if games[name] is None:
+                try:
+                    games[name] = create_game(name)
+                except Exception as e:
+                    # 預先載入失敗不影響大廳，進入遊戲時會再試一次並把錯誤丟出來
+                    print(f"警告：預先載入 {name} 失敗: {e}")
+                return
+
+    def get(self, name):
+        # 還沒預先建好的遊戲在這裡當場建立
+        if games[name] is None:
+            games[name] = create_game(name)
+        return games[name]
+
+
+preloader = GamePreloader(games)
+
+
+def show_lobby():
+    display.present(lobby.get_frame())
 
 
 def main_loop():
     global current_game
-    pressed_keys = set()  # 追蹤目前按下的 key
-    while True:
+    display.open()
+    display.set_mouse_callback(input_queue.on_mouse)
+    loop = None  # 進入遊戲時依該遊戲的 tick_rate 建立
+    running = True
+    while running:
 
         if current_game is None:
             show_lobby()
+            wait_ms = LOBBY_WAIT_MS
         else:
-            if current_game == "2. Taiko Drum":
-                from taiko_drum import TaikoDrum
-                TaikoDrum().main_loop()
+            if current_game == games["2. Taiko Drum"]:
+                # 太鼓有自己的選單與迴圈，結束後回到大廳
+                current_game.main_loop(target_fps=TARGET_FPS)
+                current_game.suspend()
                 current_game = None
+                input_queue.clear()
                 continue
-            elif current_game == games["1. Whac-A-Mole"]:
-                frame = current_game.render()
-                cv2.imshow(WINDOW_NAME, frame)
-                current_game.update()
+            if loop is None:
+                loop = GameLoop(current_game.tick_rate, TARGET_FPS)
+            if current_game == games["1. Whac-A-Mole"]:
+                loop.run_updates(current_game.timed_update)
+                if loop.should_render():
+                    frame = current_game.timed_render()
+                    display.present(current_game.draw_perf_overlay(frame))
             elif current_game == games["3. 12-Key Piano"]:
-                piano_surface.fill((60, 60, 60))
                 # 確保 piano game 物件有 screen surface
                 if games["3. 12-Key Piano"].screen is None:
                     games["3. 12-Key Piano"].screen = piano_surface
-                games["3. 12-Key Piano"].update()
-                games["3. 12-Key Piano"].render()
-                piano_array = pygame.surfarray.array3d(piano_surface)
-                piano_array = np.transpose(piano_array, (1, 0, 2))
-                cv2.imshow(WINDOW_NAME, cv2.cvtColor(piano_array, cv2.COLOR_RGB2BGR))
-
-        key = cv2.waitKey(30) & 0xFF
-
-        # --- 全域按鍵處理 (ESC) ---
-        if key == 27:  # ESC
-            if current_game is None:
-                break  # 在大廳按 ESC，離開程式
-            else:
-                if current_game == games["1. Whac-A-Mole"]:
-                    pygame.mixer.music.stop()
-                # 在遊戲中按 ESC，返回大廳
-                # 清理鋼琴遊戲可能殘留的按鍵狀態
-                if current_game == games["3. 12-Key Piano"] and pressed_keys:
-                    class DummyEvent:
-                        def __init__(self, type_, key_):
-                            self.type = type_
-                            self.key = key_
-
-                    for k in pressed_keys:
-                        current_game.handle_event(DummyEvent(pygame.KEYUP, k))
-
-                # 銷毀遊戲實例，確保下次是全新的
-                if isinstance(current_game, object):
-                    game_key_to_reset = None
-                    for name, game_instance in games.items():
-                        if current_game == game_instance:
-                            game_key_to_reset = name
-                            break
-                    if game_key_to_reset:
-                        games[game_key_to_reset] = None
-
-                cv2.setMouseCallback(WINDOW_NAME, lambda *args: None)
-                current_game = None
-                pressed_keys.clear()
-                continue  # 返回主迴圈頂部，顯示大廳
+                loop.run_updates(current_game.timed_update)
+                if loop.should_render():
+                    piano_surface.fill((60, 60, 60))
+                    current_game.timed_render()
+                    with current_game.span("surface bridge"):
+                        frame = piano_bridge.to_bgr(piano_surface)
+                    display.present(current_game.draw_perf_overlay(frame))
+            wait_ms = loop.wait_ms()
+
+        # 收集這一幀所有的鍵盤與滑鼠事件（含時間戳），整批處理
+        input_queue.poll(display, wait_ms)
+        events = input_queue.drain()
 
-        # --- 根據當前狀態處理按鍵 ---
         if current_game is None:  # --- 在大廳時 ---
-            if key == ord('1'):
-                if games["1. Whac-A-Mole"] is None:
-                    from whac_a_mole import WhacAMole
-                    games["1. Whac-A-Mole"] = WhacAMole()
-                current_game = games["1. Whac-A-Mole"]
-                cv2.setMouseCallback(WINDOW_NAME, current_game.on_mouse_click)
-            elif key == ord('2'):
-                current_game = "2. Taiko Drum"
-            elif key == ord('3'):
-                if games["3. 12-Key Piano"] is None:
-                    from piano_12keys import Piano12Keys
-                    games["3. 12-Key Piano"] = Piano12Keys(piano_surface)
-                current_game = games["3. 12-Key Piano"]
-
-        else:  # --- 在遊戲中時 ---
-            if current_game == games["3. 12-Key Piano"]:
-                class DummyEvent:
-                    def __init__(self, type_, key_):
-                        self.type = type_
-                        self.key = key_
-
-                # --- 全新且更穩定的按鍵處理邏輯 ---
-                # 1. 處理按下按鍵 (Key Down)
-                if key != 255:  # 255 代表沒有按鍵
-                    if key not in pressed_keys:
-                        pressed_keys.add(key)
-                        current_game.handle_event(DummyEvent(pygame.KEYDOWN, key))
-
-                # 2. 處理放開按鍵 (Key Up)
-                # 找出已經不在 OpenCV 回報中，卻還在我們紀錄裡的按鍵
-                released_keys = pressed_keys.copy()
-                if key != 255:
-                    released_keys.discard(key)  # 如果有按鍵，從待釋放清單中移除
-
-                if released_keys:
-                    for k in released_keys:
-                        current_game.handle_event(DummyEvent(pygame.KEYUP, k))
-                        pressed_keys.discard(k)
+            if not events:
+                preloader.step()
+            for event in events:
+                if event.type == pygame.MOUSEMOTION:
+                    lobby.handle_event(event)
+                elif event.type != pygame.KEYDOWN:
+                    continue
+                elif event.key == 27:  # 在大廳按 ESC，離開程式
+                    running = False
+                    break
+                elif event.key in GAME_KEYS:
+                    # 已經預先載入好的實例只需要重設這一局的狀態
+                    current_game = preloader.get(GAME_KEYS[event.key])
+                    current_game.resume()
+                    break
+            continue
+
+        # --- 在遊戲中時：ESC 之前的事件照常交給遊戲 ---
+        esc_index = next((i for i, e in enumerate(events)
+                          if e.type == pygame.KEYDOWN and e.key == 27), None)
+        if esc_index is None:
+            current_game.timed_handle_events(events)
+            continue
+        current_game.timed_handle_events(events[:esc_index])
+
+        # --- 在遊戲中按 ESC，返回大廳 ---
+        # 清理鋼琴遊戲可能殘留的按鍵狀態
+        input_queue.release_all()
+        current_game.handle_events([e for e in input_queue.drain() if e.type == pygame.KEYUP and e.key != 27])
+
+        # 保留實例與素材，下次進入時 resume() 只重設這一局
+        current_game.suspend()
+        current_game = None
+        loop = None
+        input_queue.clear()
 
     # --- 程式結束前的清理 ---
     pygame.quit()  # 正常關閉 Pygame
-    cv2.destroyAllWindows()
+    if PIPELINED_PRESENT:
+        print(f"presenter 統計: {display.stats()}")
+    display.close()
 
 
 if __name__ == "__main__":
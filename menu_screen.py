@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+import pygame
+
+from asset_cache import assets
+from text_cache import text_cache
+
+MENU_WAIT_MS = 100  # 等待選單按鍵時每次 poll 的時間；畫面不變，不需要更頻繁
+
+
+class MenuScreen:
+    """預先畫好的選單畫面：背景與文字只畫一次，等待按鍵時不再重畫"""
+
+    def __init__(self, background_path, screen_size, labels, font=cv2.FONT_HERSHEY_SIMPLEX):
+        # labels: [(文字, 基準點, 大小, 顏色, 粗細), ...]，描邊固定為 6px 黑色
+        self.background_path = background_path
+        self.screen_size = screen_size
+        self.labels = labels
+        self.font = font
+        self._frame = None
+
+    def frame(self):
+        if self._frame is None:
+            bg_img = assets.load_image(self.background_path, self.screen_size, interpolation=cv2.INTER_LINEAR)
+            if bg_img is not None:
+                img = bg_img.copy()
+            else:
+                img = np.ones((self.screen_size[1], self.screen_size[0], 3), dtype=np.uint8) * 30
+            for text, pos, scale, color, thickness in self.labels:
+                text_cache.draw(img, text, pos, self.font, scale, color, thickness)
+            self._frame = img
+        return self._frame
+
+    def present(self, display):
+        display.present(self.frame())
+
+    def choose(self, display, input_queue, keys, wait_ms=MENU_WAIT_MS):
+        # 顯示一次後只等待輸入，回傳第一個在 keys 裡的按鍵
+        self.present(display)
+        while True:
+            input_queue.poll(display, wait_ms)
+            for event in input_queue.drain():
+                if event.type == pygame.KEYDOWN and event.key in keys:
+                    return event.key
+
+    def invalidate(self):
+        self._frame = None
+
@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+# 原本手調的 3x3 洞口（地鼠的錨點），對準背景圖上畫好的洞
+CLASSIC_POSITIONS = [
+    (250, 180), (576, 180), (900, 180),
+    (250, 370), (576, 370), (900, 370),
+    (250, 570), (576, 570), (900, 570),
+]
+CLASSIC_CELL = (325, 195)          # 經典盤面的洞距；sprite 原始大小以這個間距為準
+BOARD_AREA = (88, 83, 1063, 668)   # 錨點可以放的範圍 (x0, y0, x1, y1)，3x3 時與經典盤面相差不到 6px
+HOLE_SIZE = (230, 112)             # 背景圖上一個洞（含土堆邊緣）的大小
+HOLE_OFFSET = 18                   # 洞的中心在錨點上方幾 px
+TEMPLATE_HOLE = 4                  # 拿中間那個洞當印章
+
+BOARD_PRESETS = {
+    'classic': (3, 3),
+    'large': (4, 6),
+    'huge': (6, 8),
+}
+
+
+def parse_board(board):
+    # 'large'、'5x7' 或 (rows, cols) 都可以
+    if isinstance(board, str):
+        if board in BOARD_PRESETS:
+            return BOARD_PRESETS[board]
+        try:
+            rows, cols = (int(n) for n in board.lower().split('x'))
+        except ValueError:
+            raise ValueError(f"未知的盤面: {board}（可用 {', '.join(BOARD_PRESETS)} 或 RxC）") from None
+    else:
+        rows, cols = board
+    if rows < 1 or cols < 1:
+        raise ValueError(f"盤面至少要 1x1: {rows}x{cols}")
+    return rows, cols
+
+
+def generate_positions(rows=3, cols=3, area=BOARD_AREA):
+    # rows x cols 個洞平均分在 area 裡，依列由上往下排（後面的畫在上面）
+    if (rows, cols) == (3, 3):
+        return list(CLASSIC_POSITIONS)
+    x0, y0, x1, y1 = area
+    cell_w, cell_h = (x1 - x0) / cols, (y1 - y0) / rows
+    return [(int(x0 + cell_w * (c + 0.5)), int(y0 + cell_h * (r + 0.5))) for r in range(rows) for c in range(cols)]
+
+
+def board_scale(rows, cols, area=BOARD_AREA):
+    # sprite 跟著洞距縮小，經典盤面以下都是 1
+    x0, y0, x1, y1 = area
+    return min(1.0, (x1 - x0) / cols / CLASSIC_CELL[0], (y1 - y0) / rows / CLASSIC_CELL[1])
+
+
+def _hole_mask(shape, centers, size):
+    mask = np.zeros(shape[:2], dtype=np.uint8)
+    axes = (size[0] // 2, size[1] // 2)
+    for x, y in centers:
+        cv2.ellipse(mask, (int(x), int(y)), axes, 0, 0, 360, 255, -1)
+    return mask
+
+
+def board_background(background, positions, scale):
+    # 經典盤面直接用原圖；其他盤面先把原本的洞補成草地，再把中間那個洞縮放後蓋到每個新洞口
+    if positions == CLASSIC_POSITIONS:
+        return background
+    h, w = background.shape[:2]
+    old = [(x, y - HOLE_OFFSET) for x, y in CLASSIC_POSITIONS]
+    mask = _hole_mask(background.shape, old, (HOLE_SIZE[0] + 16, HOLE_SIZE[1] + 16))
+    # 在 1/4 解析度補洞再放大，只取洞的部分，草地其他地方保持清晰
+    small = cv2.inpaint(cv2.resize(background, (w // 4, h // 4), interpolation=cv2.INTER_AREA),
+                        cv2.resize(mask, (w // 4, h // 4), interpolation=cv2.INTER_NEAREST), 3, cv2.INPAINT_TELEA)
+    filled = cv2.GaussianBlur(cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR), (9, 9), 0)
+    soft = cv2.GaussianBlur(mask, (21, 21), 0)[:, :, None].astype(np.float32) / 255
+    board = (filled * soft + background * (1 - soft)).astype(np.uint8)
+
+    # 洞的印章：柔邊的橢圓 alpha，縮放到新的洞距
+    hw, hh = HOLE_SIZE
+    cx, cy = CLASSIC_POSITIONS[TEMPLATE_HOLE]
+    left, top = cx - hw // 2, cy - HOLE_OFFSET - hh // 2
+    stamp = background[top:top + hh, left:left + hw].astype(np.float32)
+    alpha = _hole_mask((hh, hw), [(hw // 2, hh // 2)], (hw - 4, hh - 4))
+    alpha = cv2.GaussianBlur(alpha, (7, 7), 0).astype(np.float32) / 255
+    sw, sh = max(1, round(hw * scale)), max(1, round(hh * scale))
+    stamp = cv2.resize(stamp, (sw, sh), interpolation=cv2.INTER_AREA)
+    alpha = cv2.resize(alpha, (sw, sh), interpolation=cv2.INTER_AREA)[:, :, None]
+    offset = round(HOLE_OFFSET * scale)
+    for x, y in positions:
+        x0, y0 = x - sw // 2, y - offset - sh // 2
+        # 超出畫面的部分裁掉
+        sx0, sy0 = max(0, -x0), max(0, -y0)
+        sx1, sy1 = min(sw, w - x0), min(sh, h - y0)
+        if sx0 >= sx1 or sy0 >= sy1:
+            continue
+        roi = board[y0 + sy0:y0 + sy1, x0 + sx0:x0 + sx1]
+        a = alpha[sy0:sy1, sx0:sx1]
+        roi[:] = (stamp[sy0:sy1, sx0:sx1] * a + roi * (1 - a)).astype(np.uint8)
+    return board
@@ -1,6 +1,8 @@
 import pygame
 import re
 import random  # 用於隨機選音
+from asset_cache import assets
+from input_events import event_ticks
 
 # --- Placeholder GameBase ---
 try:
@@ -14,6 +16,15 @@ except ImportError:
         def render(self): pass
 
         def handle_event(self, event): pass
+
+        def handle_events(self, events):
+            for event in events: self.handle_event(event)
+
+        def reset_session(self): pass
+
+        def resume(self): self.reset_session()
+
+        def suspend(self): pass
 # --- Placeholder GameBase End ---
 
 WHITE_KEYS = ['C', 'D', 'E', 'F', 'G', 'A', 'B']
@@ -87,7 +98,6 @@ class Piano12Keys(GameBase):
         if not self.instruction_font_ingame:
             self.instruction_font_ingame = pygame.font.Font(None, target_font_size)
 
-        self.pressed = [False] * 12
         self.key_sounds = [None] * 12
         self.key_white_width, self.key_white_height, self.key_white_y = 80, 200, 200
         self.key_black_width, self.key_black_height, self.key_black_y = 60, 100, 100
@@ -112,7 +122,6 @@ class Piano12Keys(GameBase):
             "Jingle Bells": {"phrases": self._convert_num_score_to_phrases(jingle_bells_nums),
                              "display_name": "Jingle Bells"}
         }
-        self.active_song_notes_key, self.show_sheet_music = None, False
         self.song_keys_ordered_for_shortcuts = ["Little Bee", "Little Star", "Jingle Bells"]
         piano_actual_bottom_y = self.key_white_y + self.key_white_height
         btn_w, btn_h, btn_sp = 120, 35, 10
@@ -143,7 +152,7 @@ class Piano12Keys(GameBase):
             for idx, name in SOUND_INDEX_TO_KEY_NAME.items():
                 if name in SOUND_FILES:
                     try:
-                        self.key_sounds[idx] = pygame.mixer.Sound(SOUND_FILES[name])
+                        self.key_sounds[idx] = assets.load_sound(SOUND_FILES[name])
                     except Exception as e:
                         print(f"警告：Piano12Keys：載入音效 '{SOUND_FILES[name]}' 時發生錯誤: {e}")
 
@@ -152,18 +161,27 @@ class Piano12Keys(GameBase):
         self.max_bpm = 240;
         self.bpm_step = 5
         self._recalculate_beat_interval()
-        self.last_beat_time_ms = 0;
-        self.metronome_on = False;
         self.metronome_sound = None
         if self.mixer_ok:
             try:
-                self.metronome_sound = pygame.mixer.Sound("metronome_tick.wav")
+                self.metronome_sound = assets.load_sound("metronome_tick.wav")
             except (pygame.error, FileNotFoundError):
                 self.metronome_sound = None
             except Exception:
                 self.metronome_sound = None
-        self.metronome_visual_flash = False;
         self.metronome_visual_flash_duration_ms = 60;
+        self.playback_key_flash_duration_ms = 150;
+        self.ear_training_feedback_duration_ms = 2500
+        self.reset_session()
+        # --- ---
+
+    def reset_session(self):
+        # 回大廳再進來時重設按鍵、錄音與練耳狀態；音效、字型與 BPM 設定保留
+        self.pressed = [False] * 12
+        self.active_song_notes_key, self.show_sheet_music = None, False
+        self.last_beat_time_ms = 0;
+        self.metronome_on = False;
+        self.metronome_visual_flash = False;
         self.metronome_visual_flash_end_time_ms = 0
 
         self.playback_state = "IDLE";
@@ -171,7 +189,6 @@ class Piano12Keys(GameBase):
         self.recording_start_time_ms = 0
         self.playback_start_time_ms = 0;
         self.next_event_index_to_play = 0
-        self.playback_key_flash_duration_ms = 150;
         self.playback_flashing_keys = {}
         self.ear_training_active = False
         self.ear_training_current_key_index = None
@@ -180,8 +197,6 @@ class Piano12Keys(GameBase):
         self.ear_training_feedback_end_time_ms = 0
         self.ear_training_score = 0
         self.ear_training_total_questions = 0
-        self.ear_training_feedback_duration_ms = 2500
-        # --- ---
 
     def _recalculate_beat_interval(self):
         if self.bpm > 0:
@@ -205,10 +220,11 @@ class Piano12Keys(GameBase):
                 except pygame.error as e:
                     print(f"錯誤：播放音效索引 {idx} 時: {e}")
 
-    def _record_key_event(self, key_index):
+    def _record_key_event(self, key_index, event_time_ms=None):
         if self.playback_state == "RECORDING" and not self.ear_training_active:
-            current_time_ms = pygame.time.get_ticks()
-            timestamp = current_time_ms - self.recording_start_time_ms
+            # 用事件實際按下的時間，而不是這一幀處理到它的時間
+            current_time_ms = pygame.time.get_ticks() if event_time_ms is None else event_time_ms
+            timestamp = max(0, current_time_ms - self.recording_start_time_ms)
             self.recorded_events.append({'time': timestamp, 'key_index': key_index})
 
     def _trigger_playback_key_visual(self, key_index):
@@ -363,7 +379,7 @@ class Piano12Keys(GameBase):
                         processed = True;
                         break
                     if kc: bk_map_idx += 1
-            if key_index_pressed != -1: self._record_key_event(key_index_pressed)
+            if key_index_pressed != -1: self._record_key_event(key_index_pressed, event_ticks(event))
 
         elif event.type == pygame.KEYUP and actual_pygame_key:
             if self.playback_state != "PLAYBACK" and not self.ear_training_active:  # 回放和練耳模式不處理玩家的 keyup 以改變 pressed 狀態
@@ -427,7 +443,7 @@ class Piano12Keys(GameBase):
                     if wk_rect.collidepoint(x, y):
                         if not self.pressed[i]: self.pressed[i] = is_down; self._play_sound(i); key_index_clicked = i
                         break
-            if key_index_clicked != -1: self._record_key_event(key_index_clicked)
+            if key_index_clicked != -1: self._record_key_event(key_index_clicked, event_ticks(event))
         elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
             if self.playback_state != "PLAYBACK" and not self.ear_training_active:
                 for i in range(len(self.pressed)): self.pressed[i] = False
@@ -0,0 +1,42 @@
+import time
+
+import pygame
+
+
+class SongClock:
+    """歌曲時間（秒）：以 pygame.mixer.music 的播放位置為準，兩次位置更新之間用 perf_counter 補平"""
+
+    def __init__(self, clock=time.perf_counter, music_pos=None):
+        self.clock = clock
+        # get_pos() 回傳 play() 之後經過的毫秒，沒在播放時是 -1
+        self.music_pos = music_pos if music_pos is not None else pygame.mixer.music.get_pos
+        self.start()
+
+    def start(self, use_music=False):
+        # use_music=False（沒有背景音樂或 headless）時只用 perf_counter
+        self.use_music = use_music
+        self._origin = self.clock()
+        self._anchor_pos = None
+        self._anchor_at = self._origin
+        self._last = 0.0
+
+    def now(self):
+        t = self.clock()
+        song = t - self._origin
+        if self.use_music:
+            pos = self.music_pos()
+            if pos >= 0:
+                # mixer 的位置是一段一段跳的，跳動時重新對齊，中間用經過時間內插
+                pos /= 1000.0
+                if pos != self._anchor_pos:
+                    self._anchor_pos, self._anchor_at = pos, t
+                song = self._anchor_pos + (t - self._anchor_at)
+            elif self._anchor_pos is not None:
+                song = self._anchor_pos + (t - self._anchor_at)
+        # 不讓時間倒退，音符不會往回跳
+        self._last = max(self._last, song)
+        return self._last
+
+    def at(self, perf_time):
+        # 把 perf_counter 時間戳（例如輸入事件）換算成歌曲時間
+        return self.now() - (self.clock() - perf_time)
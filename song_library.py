@@ -0,0 +1,200 @@
+import json
+import os
+import struct
+import threading
+
+INDEX_PATH = "songs.index.json"
+INDEX_VERSION = 1
+SONG_PREFIX = "bgm_"          # 背景音樂檔名的前綴，和音效檔區分
+AUDIO_EXTENSIONS = ('.wav',)
+CHART_SUFFIX = ".chart.json"
+
+
+def read_wav_info(path):
+    # 只走過 RIFF 的 chunk 表，不解碼音訊：回傳長度、取樣率、聲道數與 LIST/INFO 裡的標題
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            raise ValueError("不是 WAV 檔")
+        fmt = None
+        data_size = None
+        title = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            chunk_id, size = struct.unpack('<4sI', header)
+            pad = size & 1  # chunk 長度是奇數時後面補一個 byte
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack('<HHIIH', f.read(14))
+                f.seek(size - 14 + pad, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                # 檔案被截斷時以實際剩下的長度為準
+                data_size = min(size, file_size - f.tell())
+                f.seek(size + pad, os.SEEK_CUR)
+            elif chunk_id == b'LIST':
+                body = f.read(size)
+                if body[:4] == b'INFO':
+                    title = _info_title(body[4:]) or title
+                f.seek(pad, os.SEEK_CUR)
+            else:
+                f.seek(size + pad, os.SEEK_CUR)
+    if fmt is None or data_size is None:
+        raise ValueError("WAV 缺少 fmt 或 data chunk")
+    _, channels, sample_rate, byte_rate, _ = fmt
+    return {
+        'duration': data_size / byte_rate if byte_rate else 0.0,
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'title': title,
+    }
+
+
+def _info_title(info):
+    # LIST/INFO 子 chunk 裡的 INAM（曲名）
+    pos = 0
+    while pos + 8 <= len(info):
+        sub_id, size = struct.unpack('<4sI', info[pos:pos + 8])
+        if sub_id == b'INAM':
+            return info[pos + 8:pos + 8 + size].split(b'\0', 1)[0].decode('utf-8', 'replace').strip() or None
+        pos += 8 + size + (size & 1)
+    return None
+
+
+def _read_chart_header(path):
+    # 譜面檔裡的 audio 與 title；不解析音符
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('audio'), data.get('title')
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class SongLibrary:
+    """歌曲目錄：從檔頭讀出長度、取樣率與標題，存成索引檔，之後只重讀 mtime 改變的檔案"""
+
+    def __init__(self, directory='.', index_path=INDEX_PATH):
+        self.directory = directory
+        self.index_path = os.path.join(directory, index_path)
+        self._songs = None      # stem -> entry，依 stem 排序
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != INDEX_VERSION:
+            return {}
+        return data.get('songs', {})
+
+    def _save_index(self, songs):
+        tmp = self.index_path + ".tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'songs': songs}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            print(f"警告：歌曲索引寫入失敗: {e}")
+
+    def _stems(self):
+        # 以 bgm_ 開頭的音樂檔，以及所有譜面檔（音樂檔可能還沒放進來）
+        stems = set()
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if name.endswith(CHART_SUFFIX):
+                stems.add(name[:-len(CHART_SUFFIX)])
+            elif name.startswith(SONG_PREFIX) and ext.lower() in AUDIO_EXTENSIONS:
+                stems.add(stem)
+        return sorted(stems)
+
+    def _find_audio(self, stem):
+        for ext in AUDIO_EXTENSIONS:
+            if os.path.exists(os.path.join(self.directory, stem + ext)):
+                return stem + ext
+        return None
+
+    def _build_entry(self, stem, audio, audio_mtime, chart_mtime):
+        name = stem[len(SONG_PREFIX):] if stem.startswith(SONG_PREFIX) else stem
+        entry = {
+            'path': audio or stem + AUDIO_EXTENSIONS[0],
+            'name': name,
+            'title': None,
+            'duration': 0.0,
+            'sample_rate': 0,
+            'channels': 0,
+            'audio_mtime': audio_mtime,
+            'chart_mtime': chart_mtime,
+        }
+        if chart_mtime is not None:
+            chart_path = os.path.join(self.directory, stem + CHART_SUFFIX)
+            try:
+                chart_audio, chart_title = _read_chart_header(chart_path)
+            except (OSError, ValueError) as e:
+                print(f"警告：譜面 {chart_path} 讀取失敗: {e}")
+            else:
+                entry['title'] = chart_title
+                if audio is None and chart_audio:
+                    entry['path'] = chart_audio
+        if audio is not None:
+            try:
+                info = read_wav_info(os.path.join(self.directory, audio))
+            except (OSError, ValueError, struct.error) as e:
+                print(f"警告：背景音樂 {audio} 讀取失敗: {e}")
+            else:
+                entry['title'] = entry['title'] or info['title']
+                entry['duration'] = info['duration']
+                entry['sample_rate'] = info['sample_rate']
+                entry['channels'] = info['channels']
+        else:
+            print(f"警告：找不到背景音樂 {entry['path']}，只能用譜面遊玩")
+        entry['title'] = entry['title'] or name.replace('_', ' ').title()
+        return entry
+
+    def scan(self):
+        # 只 stat 每個檔案；mtime 與索引相同的歌曲直接沿用，不開檔
+        with self._lock:
+            index = self._load_index()
+            songs = {}
+            changed = False
+            for stem in self._stems():
+                audio = self._find_audio(stem)
+                audio_mtime = _mtime(os.path.join(self.directory, audio)) if audio else None
+                chart_mtime = _mtime(os.path.join(self.directory, stem + CHART_SUFFIX))
+                entry = index.get(stem)
+                if (entry is None or entry.get('audio_mtime') != audio_mtime
+                        or entry.get('chart_mtime') != chart_mtime):
+                    entry = self._build_entry(stem, audio, audio_mtime, chart_mtime)
+                    changed = True
+                songs[stem] = entry
+            if changed or set(songs) != set(index):
+                self._save_index(songs)
+            self._songs = songs
+            return self.songs()
+
+    def songs(self):
+        if self._songs is None:
+            self.scan()
+        return list(self._songs.values())
+
+    def get(self, path):
+        # 依音樂檔路徑找歌曲，找不到回傳 None
+        for song in self.songs():
+            if song['path'] == path:
+                return song
+        return None
+
+    def duration(self, path):
+        song = self.get(path)
+        return song['duration'] if song is not None else 0.0
+
+
+# 所有遊戲共用的實例，第一次用到時才掃描
+song_library = SongLibrary()
@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+import pygame
+
+from hit_test import HitMask
+from sprite_blit import Sprite
+
+REVEAL_STEPS = 30  # 探頭動畫量化成幾格（不含全藏起來的第 0 格）
+
+
+class AnimFrame:
+    """動畫的一格：premultiplied sprite、相對於錨點的外框與點擊遮罩；全透明的格子 sprite 為 None"""
+
+    __slots__ = ('sprite', 'dx', 'dy', 'w', 'h', 'mask')
+
+    def __init__(self, sprite, dx, dy, mask=None):
+        self.sprite = sprite
+        self.dx, self.dy = dx, dy
+        self.w, self.h = (sprite.w, sprite.h) if sprite is not None else (0, 0)
+        self.mask = mask
+
+    def bounds(self, x, y):
+        # 錨點在 (x, y) 時這一格在畫面上的矩形
+        return pygame.Rect(x + self.dx, y + self.dy, self.w, self.h)
+
+    def hit(self, x, y, px, py):
+        # 錨點在 (x, y) 時，(px, py) 是否點在不透明的像素上；沒有遮罩的格子點不到
+        return self.mask is not None and self.mask.contains(px - x - self.dx, py - y - self.dy)
+
+
+def _opaque_bbox(image):
+    # 非全透明像素的外框 (x0, y0, x1, y1)；沒有 alpha 時就是整張圖，全透明時回傳 None
+    if image.shape[0] == 0:
+        return None
+    if image.shape[2] < 4:
+        return 0, 0, image.shape[1], image.shape[0]
+    alpha = image[:, :, 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    cols = np.flatnonzero(alpha.any(axis=0))
+    if not len(rows):
+        return None
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def reveal_frames(image, steps=REVEAL_STEPS):
+    # 從洞裡探頭：第 i 格只露出圖片上面 int(h * i / steps) 列，錨點是洞口（圖片底邊中點）
+    # 每一格裁掉全透明的邊，畫面與判定都只用到真正有東西的範圍；點擊遮罩也一起算好
+    full_h, full_w = image.shape[:2]
+    left = -((full_w + 1) // 2)  # 與原本的 int(x - w / 2) 相同
+    frames = []
+    for i in range(steps + 1):
+        visible_h = int(full_h * i / steps)
+        crop = image[:visible_h]
+        bbox = _opaque_bbox(crop)
+        if bbox is None:
+            frames.append(AnimFrame(None, 0, 0))
+            continue
+        x0, y0, x1, y1 = bbox
+        crop = crop[y0:y1, x0:x1]
+        frames.append(AnimFrame(Sprite(crop), left + x0, y0 - visible_h, HitMask(crop)))
+    return frames
+
+
+def swing_angles(count, peak, strike=0.35):
+    # 揮槌的角度曲線：前 strike 比例的時間加速敲下去（ease-out），之後平順地抬回來（ease-in-out）
+    angles = []
+    for i in range(count):
+        t = (i + 0.5) / count
+        if t < strike:
+            amount = 1 - (1 - t / strike) ** 3
+        else:
+            u = (t - strike) / (1 - strike)
+            amount = 1 - (3 * u * u - 2 * u * u * u)
+        angles.append(peak * amount)
+    return angles
+
+
+def rotation_frames(image, angles):
+    # 以圖片中心旋轉，錨點也是圖片中心；畫布放大到對角線長，轉到任何角度都不會被裁掉
+    # premultiplied 的四個通道一起內插就是正確結果，alpha 不必另外轉一次
+    h, w = image.shape[:2]
+    size = int(np.ceil(np.hypot(w, h)))
+    ox, oy = (size - w) // 2, (size - h) // 2
+    canvas = np.zeros((size, size, image.shape[2]), dtype=np.uint8)
+    canvas[oy:oy + h, ox:ox + w] = image
+    cx, cy = ox + w // 2, oy + h // 2
+    frames = []
+    for angle in angles:
+        M = cv2.getRotationMatrix2D((cx, cy), angle, 1.0)
+        rotated = cv2.warpAffine(canvas, M, (size, size), flags=cv2.INTER_LINEAR,
+                                 borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0, 0))
+        bbox = _opaque_bbox(rotated)
+        if bbox is None:
+            frames.append(AnimFrame(None, 0, 0))
+            continue
+        x0, y0, x1, y1 = bbox
+        frames.append(AnimFrame(Sprite(rotated[y0:y1, x0:x1]), x0 - cx, y0 - cy))
+    return frames
@@ -0,0 +1,137 @@
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from asset_cache import decode_image
+
+ATLAS_PATH = "sprites.atlas"
+INDEX_PATH = "sprites.atlas.json"
+ATLAS_VERSION = 1
+ALIGN = 64  # 每張圖的起點對齊 64 bytes
+
+# 遊戲實際用到的圖與尺寸；參數要和呼叫 assets.load_image 時完全一樣才會命中
+MANIFEST = [
+    # 大廳
+    dict(path="main_bg.png", size=(800, 600), interpolation=cv2.INTER_LINEAR),
+    # 太鼓
+    dict(path="taiko_drum_bgi.png", size=(800, 600), flags=cv2.IMREAD_UNCHANGED,
+         interpolation=cv2.INTER_LINEAR),
+    dict(path="taikodrum_diff_select.png", size=(800, 600), interpolation=cv2.INTER_LINEAR),
+    dict(path="A_circle.png", size=(80, 80), flags=cv2.IMREAD_UNCHANGED, keep_aspect=True),
+    dict(path="L_circle.png", size=(80, 80), flags=cv2.IMREAD_UNCHANGED, keep_aspect=True),
+    dict(path="A_miss.png", size=(80, 80), flags=cv2.IMREAD_UNCHANGED, keep_aspect=True),
+    dict(path="L_miss.png", size=(80, 80), flags=cv2.IMREAD_UNCHANGED, keep_aspect=True),
+    dict(path="A_miss_banner.png", size=(200, 80), flags=cv2.IMREAD_UNCHANGED,
+         interpolation=cv2.INTER_LINEAR),
+    dict(path="L_miss_banner.png", size=(200, 80), flags=cv2.IMREAD_UNCHANGED,
+         interpolation=cv2.INTER_LINEAR),
+    dict(path="black_miss_banner.png", size=(200, 80), flags=cv2.IMREAD_UNCHANGED,
+         interpolation=cv2.INTER_LINEAR),
+    # 打地鼠
+    dict(path="mole.png", size=(150, 150), flags=cv2.IMREAD_UNCHANGED),
+    dict(path="bomb.png", size=(150, 150), flags=cv2.IMREAD_UNCHANGED),
+    dict(path="hammer.png", size=(100, 100), flags=cv2.IMREAD_UNCHANGED),
+    dict(path="heart.png", size=(40, 40), flags=cv2.IMREAD_UNCHANGED),
+    dict(path="background.jpg", size=(1152, 768), flags=cv2.IMREAD_UNCHANGED),
+    dict(path="menu_bg.png", size=(1152, 768), flags=cv2.IMREAD_UNCHANGED),
+]
+
+
+def entry_key(path, size=None, flags=cv2.IMREAD_COLOR, keep_aspect=False, interpolation=cv2.INTER_AREA):
+    return (path, tuple(size) if size is not None else None, flags, keep_aspect, interpolation)
+
+
+class SpriteAtlas:
+    """預先縮放好的圖片打包成一個檔案，用 numpy.memmap 讀取，不必在啟動時解碼 PNG"""
+
+    def __init__(self, data, entries):
+        self.data = data        # 整個 atlas 檔的唯讀 memmap
+        self.entries = entries  # entry_key -> 唯讀 ndarray view
+
+    @classmethod
+    def open(cls, atlas_path=ATLAS_PATH, index_path=INDEX_PATH):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != ATLAS_VERSION:
+            raise ValueError(f"atlas 版本不符: {index.get('version')}")
+        data = np.memmap(atlas_path, dtype=np.uint8, mode='r')
+        entries = {}
+        for item in index['entries']:
+            # 原圖比 atlas 新就略過，改回一般的解碼流程
+            try:
+                if os.path.getmtime(item['path']) > item['mtime']:
+                    continue
+            except OSError:
+                pass
+            shape = tuple(item['shape'])
+            nbytes = int(np.prod(shape))
+            view = data[item['offset']:item['offset'] + nbytes].reshape(shape).view(np.ndarray)
+            key = entry_key(item['path'], item['size'], item['flags'], item['keep_aspect'],
+                            item['interpolation'])
+            entries[key] = view
+        return cls(data, entries)
+
+    @classmethod
+    def open_default(cls):
+        if not (os.path.exists(ATLAS_PATH) and os.path.exists(INDEX_PATH)):
+            return None
+        try:
+            return cls.open()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"警告：sprite atlas 無法讀取，改為直接解碼圖片: {e}")
+            return None
+
+    def lookup(self, path, size, flags, keep_aspect, interpolation, premultiplied):
+        img = self.entries.get(entry_key(path, size, flags, keep_aspect, interpolation))
+        if img is None:
+            return None
+        # atlas 只存 premultiplied 版本；要原始 alpha 的 BGRA 圖得自己解碼
+        if img.ndim == 3 and img.shape[2] == 4 and not premultiplied:
+            return None
+        return img
+
+
+def build_atlas(manifest=MANIFEST, atlas_path=ATLAS_PATH, index_path=INDEX_PATH):
+    entries = []
+    offset = 0
+    with open(atlas_path + ".tmp", 'wb') as out:
+        for spec in manifest:
+            spec = dict(spec)
+            path = spec.pop('path')
+            img = decode_image(path, premultiplied=True, **spec)
+            if img is None:
+                print(f"警告：略過無法讀取的 {path}")
+                continue
+            img = np.ascontiguousarray(img, dtype=np.uint8)
+            pad = -offset % ALIGN
+            out.write(b'\0' * pad)
+            offset += pad
+            out.write(img.tobytes())
+            key = entry_key(path, **spec)
+            entries.append({
+                'path': path,
+                'size': key[1],
+                'flags': key[2],
+                'keep_aspect': key[3],
+                'interpolation': key[4],
+                'offset': offset,
+                'shape': list(img.shape),
+                'mtime': os.path.getmtime(path),
+            })
+            offset += img.nbytes
+    os.replace(atlas_path + ".tmp", atlas_path)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': ATLAS_VERSION, 'entries': entries}, f, indent=1)
+    return entries
+
+
+if __name__ == '__main__':
+    # python sprite_atlas.py：重新產生 sprites.atlas 與索引檔
+    os.chdir(os.path.dirname(os.path.abspath(__file__)) or '.')
+    built = build_atlas()
+    total = sum(int(np.prod(e['shape'])) for e in built)
+    print(f"已寫入 {len(built)} 張圖到 {ATLAS_PATH}（{total / 1024 / 1024:.1f} MB）")
+    sys.exit(0 if len(built) == len(MANIFEST) else 1)
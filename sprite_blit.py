@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+
+class Sprite:
+    """premultiplied alpha 的圖片，連同預先算好的 255 - alpha 遮罩；不透明的圖直接複製"""
+
+    def __init__(self, image):
+        if image.ndim != 3 or image.shape[2] not in (3, 4):
+            raise ValueError(f"不支援的圖片形狀: {image.shape}")
+        self.h, self.w = image.shape[:2]
+        self.color = np.ascontiguousarray(image[:, :, :3])
+        self.inv_alpha = None
+        if image.shape[2] == 4:
+            alpha = image[:, :, 3]
+            if (alpha != 255).any():
+                # 三個通道都放一份，cv2.multiply 才能一次處理
+                self.inv_alpha = cv2.merge([255 - alpha] * 3)
+        self._scratch = np.empty_like(self.color)  # 混色用的暫存，避免每次配置
+
+    @property
+    def opaque(self):
+        return self.inv_alpha is None
+
+
+def _clip(dst, sprite, x, y, height):
+    # 回傳 (dst 的 ROI, 來源的 row/col slice)；完全在畫面外時回傳 None
+    dh, dw = dst.shape[:2]
+    h = sprite.h if height is None else max(0, min(height, sprite.h))
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sprite.w, dw), min(y + h, dh)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    src = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+    return dst[y0:y1, x0:x1], src
+
+
+def blit(dst, sprite, x, y, height=None):
+    # 把 sprite 的左上角貼在 (x, y)，超出畫面的部分裁掉；height 只畫上面幾列（地鼠探頭用）
+    # dst = src + dst * (255 - a) / 255，以 uint8 定點運算直接寫回 dst 的 ROI
+    clipped = _clip(dst, sprite, x, y, height)
+    if clipped is None:
+        return dst
+    roi, src = clipped
+    color = sprite.color[src]
+    if sprite.opaque:
+        roi[:] = color
+        return dst
+    scratch = sprite._scratch[:roi.shape[0], :roi.shape[1]]
+    cv2.multiply(roi, sprite.inv_alpha[src], dst=scratch, scale=1.0 / 255)
+    cv2.add(scratch, color, dst=roi)
+    return dst
+
+
+def blit_many(dst, sprite, positions, height=None):
+    # 同一張 sprite 畫在多個位置（依序畫，後面的蓋在前面的上面）
+    for x, y in positions:
+        blit(dst, sprite, int(x), int(y), height)
+    return dst
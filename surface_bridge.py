@@ -0,0 +1,52 @@
+import sys
+
+import cv2
+import numpy as np
+import pygame
+
+
+class SurfaceBridge:
+    """把 pygame Surface 交給 OpenCV：直接讀 pixel buffer，只做一次轉換到重複使用的 BGR 陣列"""
+
+    def __init__(self):
+        self._out = None
+
+    def _output(self, w, h):
+        if self._out is None or self._out.shape[:2] != (h, w):
+            self._out = np.empty((h, w, 3), dtype=np.uint8)
+        return self._out
+
+    @staticmethod
+    def _conversion_code(surface):
+        # 依 shift 算出 R/G/B 在每個 pixel 的第幾個 byte，決定一次到位的 cvtColor 代碼
+        if surface.get_bytesize() != 4:
+            return None
+        r_shift, g_shift, b_shift, _ = surface.get_shifts()
+        offsets = [shift // 8 for shift in (r_shift, g_shift, b_shift)]
+        if sys.byteorder == 'big':
+            offsets = [3 - o for o in offsets]
+        if offsets == [2, 1, 0]:
+            return cv2.COLOR_BGRA2BGR
+        if offsets == [0, 1, 2]:
+            return cv2.COLOR_RGBA2BGR
+        return None
+
+    def to_bgr(self, surface):
+        # 回傳的陣列每次呼叫都會被覆寫，需要保留請自行 copy()
+        w, h = surface.get_size()
+        out = self._output(w, h)
+        code = self._conversion_code(surface)
+        if code is None:
+            # 其他格式的 surface 走 surfarray，一樣只寫進同一個輸出陣列
+            if surface.get_bytesize() in (3, 4):
+                view = pygame.surfarray.pixels3d(surface)
+            else:
+                view = pygame.surfarray.array3d(surface)
+            np.copyto(out, view.transpose(1, 0, 2)[:, :, ::-1])
+            del view  # 釋放 surface 的 lock
+            return out
+        raw = np.frombuffer(surface.get_buffer(), dtype=np.uint8)
+        pixels = raw.reshape(h, surface.get_pitch())[:, :w * 4].reshape(h, w, 4)
+        cv2.cvtColor(pixels, code, dst=out)
+        del raw, pixels  # 釋放 surface 的 lock，之後才能繼續在上面畫
+        return out
@@ -0,0 +1,202 @@
+import argparse
+import bisect
+import json
+import os
+import random
+import wave
+
+# 譜面檔（JSON）格式：
+# {
+#   "audio": "bgm_moonheart.wav",
+#   "offset": 0.0,                      # 第 0 拍在音樂中的秒數
+#   "bpm": [[0, 120], [64, 150]],       # [從第幾拍開始, BPM]
+#   "difficulties": {
+#     "easy": [[4, "A"], [5.5, "L"], [8, "roll", 2], ...],   # [拍, 種類, roll 長度(拍)]
+#     ...
+#   }
+# }
+CHART_VERSION = 1
+NOTE_TYPES = {'A': 'left', 'L': 'right', 'roll': 'roll'}
+LEAD_IN = 2.0  # 秒；產生譜面時第一個音符前留的空白
+
+
+def chart_path_for(audio_path):
+    return os.path.splitext(audio_path)[0] + ".chart.json"
+
+
+class TempoMap:
+    # 拍數與秒數互換，支援中途變換 BPM
+    def __init__(self, bpm_changes, offset=0.0):
+        changes = sorted((float(beat), float(bpm)) for beat, bpm in bpm_changes)
+        if not changes or changes[0][0] != 0:
+            raise ValueError("bpm 列表必須從第 0 拍開始")
+        self.beats = [beat for beat, _ in changes]
+        self.bpms = [bpm for _, bpm in changes]
+        self.seconds = [offset]
+        for i in range(1, len(changes)):
+            span = self.beats[i] - self.beats[i - 1]
+            self.seconds.append(self.seconds[-1] + span * 60.0 / self.bpms[i - 1])
+
+    def to_seconds(self, beat):
+        i = bisect.bisect_right(self.beats, beat) - 1
+        return self.seconds[i] + (beat - self.beats[i]) * 60.0 / self.bpms[i]
+
+    def to_beats(self, seconds):
+        i = max(bisect.bisect_right(self.seconds, seconds) - 1, 0)
+        return self.beats[i] + (seconds - self.seconds[i]) * self.bpms[i] / 60.0
+
+
+class ChartTrack:
+    """單一難度的譜面：依進場時間排序，遊戲只需要往前推一個游標"""
+
+    def __init__(self, notes):
+        # note: {'start': 開始判定的秒數, 'time': x 對齊判定圓的秒數, 'type', 'duration'}
+        # roll 的 x 是尾端，所以 time = start + duration；一般音符兩者相同
+        self.notes = sorted(notes, key=lambda n: n['start'])
+        self.starts = [n['start'] for n in self.notes]
+
+    def __len__(self):
+        return len(self.notes)
+
+    def seek(self, song_time):
+        # 回傳第一個 start >= song_time 的索引，中途開始或重播時用
+        return bisect.bisect_left(self.starts, song_time)
+
+    @property
+    def end_time(self):
+        return max((n['time'] for n in self.notes), default=0.0)
+
+
+class Chart:
+    def __init__(self, audio, tempo, tracks):
+        self.audio = audio
+        self.tempo = tempo
+        self.tracks = tracks  # difficulty -> ChartTrack
+
+    def track(self, difficulty):
+        if difficulty in self.tracks:
+            return self.tracks[difficulty]
+        # 沒有這個難度就用最接近的一個
+        return next(iter(self.tracks.values()))
+
+
+def parse_chart(data):
+    if data.get('version', CHART_VERSION) != CHART_VERSION:
+        raise ValueError(f"譜面版本不符: {data.get('version')}")
+    tempo = TempoMap(data['bpm'], data.get('offset', 0.0))
+    tracks = {}
+    for difficulty, entries in data['difficulties'].items():
+        notes = []
+        for entry in entries:
+            beat, kind = entry[0], entry[1]
+            if kind not in NOTE_TYPES:
+                raise ValueError(f"未知的音符種類: {kind}")
+            start = tempo.to_seconds(beat)
+            duration = 0.0
+            if kind == 'roll':
+                duration = tempo.to_seconds(beat + entry[2]) - start
+            notes.append({'start': start, 'time': start + duration,
+                          'type': NOTE_TYPES[kind], 'duration': duration})
+        tracks[difficulty] = ChartTrack(notes)
+    if not tracks:
+        raise ValueError("譜面沒有任何難度")
+    return Chart(data.get('audio'), tempo, tracks)
+
+
+def load_chart(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_chart(json.load(f))
+
+
+def generate_chart_data(audio, length, difficulties, bpm=120.0, seed=None, subdivision=4, roll_chance=0.1):
+    # 隨機譜面：沿用原本「每個 group 隨機 2/4/6 顆、偶爾一條 roll」的規則，一次產生整首歌
+    # difficulties: {name: group_interval 秒}；音符對齊到 1/subdivision 拍
+    rng = random.Random(seed)
+    spb = 60.0 / bpm
+
+    def to_beat(seconds):
+        return round(seconds / spb * subdivision) / subdivision
+
+    result = {}
+    for name, interval in difficulties.items():
+        entries = []
+        roll_groups, forbidden_groups = set(), set()
+        last_roll_group = -10
+        group_count = int((length - LEAD_IN) // interval)
+        for group_idx in range(group_count):
+            group_start = LEAD_IN + group_idx * interval
+            # 只在間隔夠遠時才產生 roll：forbidden(預備)-roll本體-forbidden
+            if group_idx - last_roll_group >= 4 and rng.random() < roll_chance and group_idx + 2 < group_count:
+                forbidden_groups.update([group_idx, group_idx + 2])
+                roll_groups.add(group_idx + 1)
+                last_roll_group = group_idx + 1
+            if group_idx in roll_groups:
+                entries.append([to_beat(group_start), 'roll', to_beat(interval)])
+            elif group_idx in forbidden_groups:
+                continue
+            else:
+                note_count = rng.choice([2, 4, 6])
+                min_interval = 0.3
+                t = rng.uniform(0, interval - (note_count - 1) * min_interval)
+                beats = []
+                for i in range(note_count):
+                    beats.append(to_beat(group_start + t))
+                    if i < note_count - 1:
+                        t += rng.uniform(min_interval, (interval - t) / (note_count - i - 1))
+                for beat in sorted(set(beats)):
+                    entries.append([beat, rng.choice(['A', 'L'])])
+        result[name] = entries
+    return {
+        'version': CHART_VERSION,
+        'audio': audio,
+        'offset': 0.0,
+        'bpm': [[0, bpm]],
+        'difficulties': result,
+    }
+
+
+def generate_chart(audio, length, difficulties, bpm=120.0, seed=None, roll_chance=0.1):
+    return parse_chart(generate_chart_data(audio, length, difficulties, bpm, seed, roll_chance=roll_chance))
+
+
+def wav_length(path):
+    with wave.open(path, 'rb') as w:
+        return w.getnframes() / float(w.getframerate())
+
+
+def main(argv=None):
+    from taiko_drum import TaikoDrum
+    parser = argparse.ArgumentParser(description="為一首歌產生隨機譜面檔（之後可以手動修改）")
+    parser.add_argument('audio')
+    parser.add_argument('--length', type=float, help="歌曲秒數；預設讀取 WAV 長度")
+    parser.add_argument('--bpm', type=float, default=120.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="預設為 <audio>.chart.json")
+    args = parser.parse_args(argv)
+    length = args.length
+    if length is None:
+        try:
+            length = wav_length(args.audio)
+        except (OSError, wave.Error, EOFError) as e:
+            parser.error(f"無法讀取 {args.audio} 的長度，請用 --length 指定: {e}")
+    difficulties = {name: interval for name, (_, interval) in TaikoDrum.DIFFICULTY_SETTINGS.items()}
+    data = generate_chart_data(os.path.basename(args.audio), length, difficulties, args.bpm, args.seed)
+    out = args.out or chart_path_for(args.audio)
+    with open(out, 'w', encoding='utf-8') as f:
+        # 一個音符一行，方便手動編修
+        f.write('{\n')
+        for key in ('version', 'audio', 'offset', 'bpm'):
+            f.write(f'  "{key}": {json.dumps(data[key])},\n')
+        f.write('  "difficulties": {\n')
+        names = list(data['difficulties'])
+        for i, name in enumerate(names):
+            entries = data['difficulties'][name]
+            f.write(f'    "{name}": [\n')
+            f.write(',\n'.join('      ' + json.dumps(entry) for entry in entries))
+            f.write('\n    ]' + (',' if i < len(names) - 1 else '') + '\n')
+        f.write('  }\n}\n')
+    print(f"已寫入 {out}：" + ", ".join(f"{n} {len(e)} 顆" for n, e in data['difficulties'].items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,69 +1,98 @@
 import cv2
+import itertools
+import logging
+import logging.handlers
 import numpy as np
-import random
+import sys
 import time
+from collections import Counter
 from game_base import GameBase
 from threading import Thread
 import pygame
 import os
+from asset_cache import assets
+from game_loop import GameLoop, DEFAULT_TARGET_FPS
+from display import CvDisplay
+from input_events import InputQueue, NO_KEY
+from song_clock import SongClock
+from taiko_chart import chart_path_for, load_chart, generate_chart
+from song_library import song_library
+from sprite_blit import Sprite
+from taiko_notes import NoteStore, TYPE_CODES, NOTE_LEFT, NOTE_RIGHT, NOTE_ROLL, MISSED, HIT
+from taiko_hud import TaikoHud
+from menu_screen import MenuScreen
+from text_cache import measure_text, text_cache, wrap_text
 
-# 新增：統一視窗名稱
-WINDOW_NAME = "MultiMedia Game"
+RANDOM_CHART_LENGTH = 120  # 秒；找不到音樂時隨機譜面的長度
+
+# 判定的除錯訊息：預設不輸出；設定環境變數 TAIKO_DEBUG=1 才開，
+# 而且先放進 MemoryHandler 緩衝，滿了或程式結束時才一次寫出，不在按鍵處理中同步寫 console
+logger = logging.getLogger("taiko")
+logger.propagate = False
+if os.environ.get("TAIKO_DEBUG"):
+    logger.setLevel(logging.DEBUG)
+    _console = logging.StreamHandler(sys.stderr)
+    _console.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    logger.addHandler(logging.handlers.MemoryHandler(512, flushLevel=logging.WARNING, target=_console))
+else:
+    logger.setLevel(logging.WARNING)
 
 class TaikoDrum(GameBase):
-    def resize_keep_aspect(self, img, max_width, max_height):
-        h, w = img.shape[:2]
-        scale = min(max_width / w, max_height / h)
-        new_w, new_h = int(w * scale), int(h * scale)
-        return cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    # 音符位置由歌曲時間算出，tick_rate 只決定判定與產生音符的頻率
+    tick_rate = 1000 / 30
+    # 難度 -> (scroll_speed 每秒像素, 隨機譜面的 group_interval)；原本是每 30ms tick 移動 2/4/7 px
+    DIFFICULTY_SETTINGS = {
+        'easy': (67, 2.5),
+        'normal': (133, 1.5),
+        'hard': (233, 1.2),
+    }
+    DIFFICULTY_KEYS = {ord('1'): 'easy', ord('2'): 'normal', ord('3'): 'hard'}
 
-    def __init__(self, screen_size=(800, 600), speed=5, interval=5.0):
+    def __init__(self, screen_size=(800, 600), speed=150, interval=5.0, display=None, input_queue=None):
         super().__init__("Taiko Drum")
+        self.display = display if display is not None else CvDisplay()
+        self.input_queue = input_queue if input_queue is not None else InputQueue()
         self.screen_size = screen_size
         self.font = cv2.FONT_HERSHEY_SIMPLEX
-        self.notes = []
-        self.score = 0
         # 判定圓與音符軌道y座標設為畫面上下置中，x維持在左側
         self.judge_x = 105  # 再往左移動5
         self.center_y = self.screen_size[1] // 2 - 10
-        self.combo = 0
-        self.current_group = -1
-        self.group_notes = []
-        self.group_note_idx = 0
-        self.group_start_time = 0
         self.group_interval = interval  # 秒
-        self.last_time = time.time()
-        self.note_speed = speed
-        self.judge_text = None  # (text, color, show_until_time)
+        self.scroll_speed = speed  # 每秒像素
+        self.difficulty = 'normal'
+        self.notes = NoteStore()  # 畫面上的音符，槽位重複使用
+        self.clock = time.perf_counter  # 判定文字、連打間隔與按鍵補位移用的時鐘；模擬器換成虛擬時鐘
+        self.song_clock = SongClock()
+        self.muted = False  # 不播放任何音效（模擬器用）
 
         # 初始化 pygame mixer
         if not pygame.mixer.get_init():
             pygame.mixer.init()
         # 載入音效
         try:
-            self.adrum_sound = pygame.mixer.Sound("Adrum.wav")
+            self.adrum_sound = assets.load_sound("Adrum.wav")
         except Exception as e:
             print(f"警告：Adrum.wav 載入失敗: {e}")
             self.adrum_sound = None
         try:
-            self.ldrum_sound = pygame.mixer.Sound("Ldrum.wav")
+            self.ldrum_sound = assets.load_sound("Ldrum.wav")
         except Exception as e:
             print(f"警告：Ldrum.wav 載入失敗: {e}")
             self.ldrum_sound = None
         try:
-            self.wrong_sound = pygame.mixer.Sound("Wrong.wav")
+            self.wrong_sound = assets.load_sound("Wrong.wav")
         except Exception as e:
             print(f"警告：Wrong.wav 載入失敗: {e}")
             self.wrong_sound = None
         try:
-            self.taiko_select_sound = pygame.mixer.Sound("taiko_select_sound.wav")
+            self.taiko_select_sound = assets.load_sound("taiko_select_sound.wav")
         except Exception as e:
             print(f"警告：taiko_select_sound.wav 載入失敗: {e}")
             self.taiko_select_sound = None
 
-        # 載入圖片（等比例縮放），先判斷是否載入成功
-        def safe_imread(path, fallback_shape=None):
-            img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        # 載入圖片（等比例縮放），先判斷是否載入成功；解碼與縮放結果由 assets 快取
+        def safe_imread(path, fallback_shape=None, **kwargs):
+            img = assets.load_image(path, flags=cv2.IMREAD_UNCHANGED, premultiplied=True, **kwargs)
             if img is None:
                 print(f"警告：載入 {path} 失敗")
                 if fallback_shape is not None:
@@ -71,34 +100,125 @@ class TaikoDrum(GameBase):
                 return None
             return img
 
-        bg_img = safe_imread("taiko_drum_bgi.png", (self.screen_size[1], self.screen_size[0], 3))
-        self.background = cv2.resize(bg_img, self.screen_size) if bg_img is not None else np.zeros((self.screen_size[1], self.screen_size[0], 3), dtype=np.uint8)
-        self.a_circle = self.resize_keep_aspect(safe_imread('A_circle.png', (80, 80, 4)), 80, 80)
-        self.l_circle = self.resize_keep_aspect(safe_imread('L_circle.png', (80, 80, 4)), 80, 80)
-        self.a_miss = self.resize_keep_aspect(safe_imread('A_miss.png', (80, 80, 4)), 80, 80)
-        self.l_miss = self.resize_keep_aspect(safe_imread('L_miss.png', (80, 80, 4)), 80, 80)
-        amb = safe_imread('A_miss_banner.png', (80, 200, 4))
-        self.a_miss_banner = cv2.resize(amb, (200, 80)) if amb is not None else np.zeros((80, 200, 4), dtype=np.uint8)
-        lmb = safe_imread('L_miss_banner.png', (80, 200, 4))
-        self.l_miss_banner = cv2.resize(lmb, (200, 80)) if lmb is not None else np.zeros((80, 200, 4), dtype=np.uint8)
-        bmb = safe_imread('black_miss_banner.png', (80, 200, 4))
-        self.black_miss_banner = cv2.resize(bmb, (200, 80)) if bmb is not None else np.zeros((80, 200, 4), dtype=np.uint8)
-        self.miss_banner = None  # (img, show_until_time)
-        self.last_roll_time = 0
+        self.background = safe_imread("taiko_drum_bgi.png", (self.screen_size[1], self.screen_size[0], 3),
+                                      size=self.screen_size, interpolation=cv2.INTER_LINEAR)
+        self.hud = TaikoHud(self.background, self.screen_size, self.font)
+        self.songs = song_library.songs()[:9]
+        # 三個選單共用同一張背景，y座標分別為265, 395, 525
+        menu_bg = "taikodrum_diff_select.png"
+        self.menus = {
+            'difficulty': MenuScreen(menu_bg, self.screen_size, [
+                ("1. Easy (Slow)", (385, 265), 1.0, (0,255,0), 3),
+                ("2. Normal (Medium)", (385, 395), 1.0, (255,255,0), 3),
+                ("3. Difficult (Fast)", (385, 525), 1.0, (255,0,0), 3),
+                ("ESC to back", (125, 650), 1, (180,180,180), 2),
+            ], self.font),
+            'music': MenuScreen(menu_bg, self.screen_size, self.music_menu_labels(), self.font),
+            'crush': MenuScreen(menu_bg, self.screen_size, [
+                ("Crush watching?", (385, 265), 1.0, (255,255,255), 3),
+                ("1. Yes", (385, 395), 1.0, (255,255,0), 3),
+                ("2. No", (385, 525), 1.0, (255,255,0), 3),
+            ], self.font),
+        }
+        self.a_circle = safe_imread('A_circle.png', (80, 80, 4), size=(80, 80), keep_aspect=True)
+        self.l_circle = safe_imread('L_circle.png', (80, 80, 4), size=(80, 80), keep_aspect=True)
+        self.a_miss = safe_imread('A_miss.png', (80, 80, 4), size=(80, 80), keep_aspect=True)
+        self.l_miss = safe_imread('L_miss.png', (80, 80, 4), size=(80, 80), keep_aspect=True)
+        self.a_miss_banner = safe_imread('A_miss_banner.png', (80, 200, 4), size=(200, 80), interpolation=cv2.INTER_LINEAR)
+        self.l_miss_banner = safe_imread('L_miss_banner.png', (80, 200, 4), size=(200, 80), interpolation=cv2.INTER_LINEAR)
+        self.black_miss_banner = safe_imread('black_miss_banner.png', (80, 200, 4), size=(200, 80), interpolation=cv2.INTER_LINEAR)
+        self.note_sprites = {NOTE_LEFT: Sprite(self.a_circle), NOTE_RIGHT: Sprite(self.l_circle)}
         self.roll_cooldown = 4.0  # 最短間隔，避免太密集
 
-        self.bgm_path = "bgm_moonheart.wav"
-        self.bgm_length = 0
-        try:
-            bgm_sound = pygame.mixer.Sound(self.bgm_path)
-            self.bgm_length = bgm_sound.get_length()
-        except Exception as e:
-            print(f"警告：背景音樂載入失敗: {e}")
-            self.bgm_length = 0
+        self._charts = {}       # path -> Chart，譜面只解析一次
+        self.select_song(self.songs[0]['path'] if self.songs else "bgm_moonheart.wav")
+        self.reset_session()
+
+    def reset_session(self):
+        # 每次從大廳進來重開一局；圖片、音效與歌曲長度保留
+        self.notes.clear()
+        self.score = 0
+        self.combo = 0
+        self.max_combo = 0
+        self.last_combo_bonus = 0
+        self.chart_idx = 0  # 下一個要進場的譜面音符
+        self.judge_text = None  # (text, color, show_until_time)
+        self.judgements = Counter()  # 判定名稱 -> 次數；roll 連打記在 'Roll'
+        self.last_tick_time = self.clock()  # 最後一次 update 的時間，判定按鍵時用來補位移
+        self.miss_banner = None  # (img, show_until_time)
+        self.last_roll_time = 0
+        self.crush_mode = False
         self.bgm_start_time = None
+        self.song_clock.start()
+        self.song_now = 0.0  # 最後一次 update 的歌曲時間（秒）
+
+    def suspend(self):
+        pygame.mixer.music.stop()
+        self.input_queue.clear()
+
+    def load_bgm_length(self, path):
+        # 長度來自歌曲索引（檔頭），不解碼整首歌
+        return song_library.duration(path)
+
+    def select_song(self, path):
+        song = song_library.get(path)
+        self.bgm_path = path
+        self.bgm_length = self.load_bgm_length(path)
+        self.song_name = song['name'] if song is not None else os.path.splitext(os.path.basename(path))[0]
+        self.load_chart()
+
+    def music_menu_labels(self):
+        # 歌曲清單來自 song_library，最多 9 首（按鍵 1~9）
+        # 歌名排在標題下方到畫面底部留白之間；歌多時間距變小，字也跟著縮小
+        labels = [("Song Select", (385, 265), 1.0, (255,255,255), 3)]
+        colors = [(255,200,200), (200,200,255)]
+        top, bottom = 395, self.screen_size[1] - 40
+        step = min(130, (bottom - top) // max(1, len(self.songs) - 1))
+        scale = min(1.0, step / 45)
+        thickness = 3 if scale >= 0.8 else 2
+        for i, song in enumerate(self.songs):
+            labels.append((f"{i+1}. {song['title']}", (385, top + i * step), scale, colors[i % 2], thickness))
+        labels.append(("ESC to back", (125, self.screen_size[1] - 15), 1, (180,180,180), 2))
+        return labels
+
+    def load_chart(self):
+        # 讀取目前歌曲的譜面；沒有譜面檔時一次產生整首的隨機譜面，遊戲中途不再產生音符
+        chart = self._charts.get(self.bgm_path)
+        if chart is None:
+            path = chart_path_for(self.bgm_path)
+            try:
+                chart = load_chart(path)
+            except FileNotFoundError:
+                chart = None
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                print(f"警告：譜面 {path} 讀取失敗，改用隨機譜面: {e}")
+                chart = None
+            if chart is None:
+                intervals = {name: interval for name, (_, interval) in self.DIFFICULTY_SETTINGS.items()}
+                chart = generate_chart(self.bgm_path, self.bgm_length or RANDOM_CHART_LENGTH, intervals)
+            self._charts[self.bgm_path] = chart
+        self.chart_track = chart.track(self.difficulty)
+        self.chart_idx = 0
+
+    def read_key(self, wait_ms):
+        # 選單用：一次取一個事件，回傳第一個按下的鍵，後面的事件留在佇列裡；佇列空了才等待 wait_ms
+        event = self.input_queue.pop()
+        if event is None:
+            self.input_queue.poll(self.display, wait_ms)
+            event = self.input_queue.pop()
+        while event is not None:
+            if event.type == pygame.KEYDOWN:
+                return event.key
+            event = self.input_queue.pop()
+        return NO_KEY
+
+    def set_difficulty(self, difficulty):
+        self.difficulty = difficulty
+        self.scroll_speed, self.group_interval = self.DIFFICULTY_SETTINGS[difficulty]
+        self.load_chart()
 
     def play_sound(self, sound, volume=1.0):
-        if sound is None:
+        if sound is None or self.muted:
             return
         try:
             sound.set_volume(volume)
@@ -109,96 +229,49 @@ class TaikoDrum(GameBase):
     def play_select_sound(self):
         self.play_sound(self.taiko_select_sound, 0.7)
 
-    def start_new_group(self):
-        if not hasattr(self, 'roll_groups'):
-            self.roll_groups = set()
-        if not hasattr(self, 'forbidden_groups'):
-            self.forbidden_groups = set()
-        if not hasattr(self, 'last_roll_group'):
-            self.last_roll_group = -10
-
-        now = time.time()
-        group_idx = int(now // self.group_interval)
-        roll_prob = 1.0 / 10.0
-        # 只在間隔夠遠時才產生 roll
-        if (group_idx - self.last_roll_group >= 4) and (random.random() < roll_prob):
-            # forbidden(預備)-roll本體-forbidden
-            self.forbidden_groups.update([group_idx, group_idx+2])
-            self.roll_groups.add(group_idx+1)  # 只記錄本體group
-            self.last_roll_group = group_idx+1
+    def travel_time(self):
+        # 音符從畫面右緣移動到判定圓所需的秒數
+        return (self.screen_size[0] - self.judge_x) / self.scroll_speed
 
-        notes = []
-        # roll本體group才產生roll條
-        if group_idx in self.roll_groups:
-            notes.append({'time': 0.0, 'type': 'roll', 'duration': self.group_interval, 'group_idx': group_idx})
-        # forbidden group 什麼都不產生
-        elif group_idx in self.forbidden_groups:
-            pass
-        # 其他 group 才產生 A/L 音符
-        else:
-            note_count = random.choice([2, 4, 6])
-            min_interval = 0.3
-            max_time = self.group_interval
-            times = []
-            t = random.uniform(0, max_time - (note_count - 1) * min_interval)
-            for i in range(note_count):
-                times.append(t)
-                if i < note_count - 1:
-                    t += random.uniform(min_interval,
-                                        (max_time - t) / (note_count - i - 1) if (note_count - i - 1) > 0 else min_interval)
-            for tt in times:
-                notes.append({'time': tt, 'type': random.choice(['left', 'right'])})
-
-        self.group_notes = [(n['time'], n) for n in notes]
-        self.group_notes.sort()
-        self.group_note_idx = 0
-        self.group_start_time = time.time()
+    def chart_finished(self):
+        return self.chart_idx >= len(self.chart_track) and not len(self.notes)
 
     def update(self):
-        now = time.time()
-        group = int(now // self.group_interval)
-        if group != self.current_group:
-            self.current_group = group
-            self.start_new_group()
-        # 產生新音符
-        while (self.group_note_idx < len(self.group_notes) and
-               now - self.group_start_time >= self.group_notes[self.group_note_idx][0]):
-            note_info = self.group_notes[self.group_note_idx][1]
-            if note_info['type'] == 'roll':
-                # roll條本體只在本體group產生，x從右側進場，移動到左側
-                roll_pixel_len = int(self.note_speed * (note_info['duration'] * 1000 / 30))
-                self.notes.append({'x': 800, 'type': 'roll', 'hit': False, 'miss': False, 'roll_hits': 0, 'roll_active': True, 'duration': note_info['duration'], 'start_x': 800, 'end_x': 800 - roll_pixel_len, 'group_idx': note_info['group_idx']})
-            else:
-                self.notes.append({'x': 800, 'type': note_info['type'], 'hit': False, 'miss': False})
-            self.group_note_idx += 1
-        missed = False
-        for note in self.notes:
-            if note['type'] == 'roll':
-                note['x'] -= self.note_speed
-                note['end_x'] -= self.note_speed
-                # 只在roll本體group期間才允許判定
-                if note['roll_active'] and note['x'] < self.judge_x - 45:
-                    note['roll_active'] = False
-                    self.score += note['roll_hits']
-                    self.judge_text = (f"Roll+{note['roll_hits']}", (255,0,255), now + 0.7)
+        now = self.clock()
+        song_now = self.song_clock.now()
+        self.song_now = song_now
+        # 產生新音符：譜面已依進場時間排好，只要把游標往前推
+        travel = self.travel_time()
+        chart_notes = self.chart_track.notes
+        while self.chart_idx < len(chart_notes) and song_now >= chart_notes[self.chart_idx]['start'] - travel:
+            note_info = chart_notes[self.chart_idx]
+            self.notes.spawn(note_info['time'], TYPE_CODES[note_info['type']], note_info['duration'], self.screen_size[0])
+            self.chart_idx += 1
+        # 音符的 x 完全由擊打時刻與歌曲時間決定，不會隨掉幀累積誤差；miss 與回收一起向量化處理
+        missed, finished_rolls = self.notes.update(song_now, self.judge_x, self.scroll_speed)
+        for slot in finished_rolls:
+            roll_hits = int(self.notes.roll_hits[slot])
+            self.score += roll_hits
+            self.judge_text = (f"Roll+{roll_hits}", (255,0,255), now + 0.7)
+        if len(missed):
+            last = missed[np.argmax(self.notes.time[missed])]
+            if self.notes.type[last] == NOTE_LEFT:
+                self.miss_banner = (self.a_miss_banner, now + 0.5)
             else:
-                note['x'] -= self.note_speed
-                if not note['hit'] and not note['miss'] and note['x'] < self.judge_x - 30:
-                    note['miss'] = True
-                    missed = True
-                    if note['type'] == 'left':
-                        self.miss_banner = (self.a_miss_banner, now + 0.5)
-                    else:
-                        self.miss_banner = (self.l_miss_banner, now + 0.5)
-        if missed:
+                self.miss_banner = (self.l_miss_banner, now + 0.5)
             self.combo = 0
             self.play_sound(self.wrong_sound)
-            self.judge_text = ("Miss", (0,0,0), now + 0.5)
-        self.notes = [n for n in self.notes if n['x'] > 0 and not (n.get('type') == 'roll' and not n['roll_active']) and not n.get('hit', False)]
+            self.judge("Miss", (0,0,0), now + 0.5, count=len(missed))
         if self.miss_banner and now > self.miss_banner[1]:
             self.miss_banner = None
         if self.judge_text and now > self.judge_text[2]:
             self.judge_text = None
+        self.last_tick_time = self.clock()
+
+    def judge(self, text, color, show_until, tally=None, count=1):
+        # 顯示判定文字，同時記入統計
+        self.judgements[tally or text] += count
+        self.judge_text = (text, color, show_until)
 
     def get_bonus(self):
         # 根據 combo 決定 bonus 倍率
@@ -217,117 +290,91 @@ class TaikoDrum(GameBase):
         else:
             return 10
 
-    def handle_event(self, key):
+    def press_offset(self, event):
+        # 音符位置停在最後一次 tick；換算到實際按下的那一刻，音符又往左移了多少像素
+        # 按鍵若早於該次 tick，offset 為負，等於把音符放回當時更右邊的位置
+        lag = getattr(event, 'time', self.last_tick_time) - self.last_tick_time
+        return lag * self.scroll_speed
+
+    def handle_event(self, event):
+        if event.type != pygame.KEYDOWN:
+            return
+        key = event.key
+        offset = self.press_offset(event)
         hit = False
-        now = time.time()
+        now = self.clock()
         self.last_combo_bonus = 0
         bonus = self.get_bonus()  # 取得當前bonus
         if key == ord('a') or key == ord('l'):
-            for note in self.notes:
-                if note['type'] == 'roll' and note['roll_active']:
-                    # Debug: 印出group_idx與now//group_interval
-                    print(f"[DEBUG] 判定時: note['group_idx']={note.get('group_idx')}, now_group={int(now // self.group_interval)}, note['x']={note['x']}, note['end_x']={note['end_x']}, judge_x={self.judge_x}")
-                    # 僅根據 roll note 的 x~end_x 是否覆蓋判定區來判斷
-                    roll_left = min(note['x'], note['end_x'])
-                    roll_right = max(note['x'], note['end_x'])
-                    print(f"[DEBUG] 判定區間: roll_left={roll_left}, roll_right={roll_right}, judge_x={self.judge_x}")
-                    if roll_left - 45 <= self.judge_x <= roll_right + 45:
-                        note['roll_hits'] += 1
+            notes = self.notes
+            # 僅根據 roll note 的 x~end_x 是否覆蓋判定區來判斷
+            slot = notes.find_roll(self.judge_x, self.scroll_speed, offset)
+            if slot >= 0:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("roll 判定: slot=%d x=%.1f end_x=%.1f offset=%.1f judge_x=%d", slot, notes.x[slot],
+                                 notes.end_x(slot, self.scroll_speed), offset, self.judge_x)
+                notes.roll_hits[slot] += 1
+                self.combo += 1
+                self.score += 3 + bonus  # 加上bonus
+                self.last_combo_bonus = self.combo
+                self.play_sound(self.adrum_sound if key == ord('a') else self.ldrum_sound, 0.25)
+                self.judge("Perfect", (0,0,255), now + 0.2, tally='Roll')
+                hit = True
+            if not hit:
+                slot, dx = notes.find_note(self.judge_x, offset, 45)
+                if slot >= 0:
+                    note_type = notes.type[slot]
+                    if note_type == NOTE_LEFT and key == ord('a'):
+                        notes.state[slot] = HIT
                         self.combo += 1
-                        self.score += 3 + bonus  # 加上bonus
-                        self.last_combo_bonus = self.combo
-                        self.play_sound(self.adrum_sound if key == ord('a') else self.ldrum_sound, 0.25)
-                        self.judge_text = ("Perfect", (0,0,255), now + 0.2)
+                        if dx <= 15:  # perfect
+                            self.score += 3 + bonus
+                            self.last_combo_bonus = self.combo
+                            self.judge("Perfect", (0,0,255), now + 0.5)
+                            self.play_sound(self.adrum_sound, 0.25)
+                        elif dx <= 30:  # cool
+                            self.score += 2 + bonus
+                            self.last_combo_bonus = self.combo
+                            self.judge("Cool", (0,128,255), now + 0.5)
+                            self.play_sound(self.adrum_sound, 0.5)
+                        else:  # good
+                            self.score += 1 + bonus
+                            self.last_combo_bonus = self.combo
+                            self.judge("Good", (0,255,255), now + 0.5)
+                            self.play_sound(self.adrum_sound, 1.0)
+                        hit = True
+                    elif note_type == NOTE_RIGHT and key == ord('l'):
+                        notes.state[slot] = HIT
+                        self.combo += 1
+                        if dx <= 15:
+                            self.score += 3 + bonus
+                            self.last_combo_bonus = self.combo
+                            self.judge("Perfect", (0,0,255), now + 0.5)
+                            self.play_sound(self.ldrum_sound, 0.25)
+                        elif dx <= 30:
+                            self.score += 2 + bonus
+                            self.last_combo_bonus = self.combo
+                            self.judge("Cool", (0,128,255), now + 0.5)
+                            self.play_sound(self.ldrum_sound, 0.5)
+                        else:
+                            self.score += 1 + bonus
+                            self.last_combo_bonus = self.combo
+                            self.judge("Good", (0,255,255), now + 0.5)
+                            self.play_sound(self.ldrum_sound, 1.0)
+                        hit = True
+                    else:
+                        notes.state[slot] = MISSED
+                        self.combo = 0
+                        self.last_combo_bonus = 0
+                        self.play_sound(self.wrong_sound, 1.0)
+                        self.judge("Miss", (0,0,0), now + 0.5)
+                        if note_type == NOTE_LEFT:
+                            self.miss_banner = (self.a_miss_banner, now + 0.5)
+                        else:
+                            self.miss_banner = (self.l_miss_banner, now + 0.5)
                         hit = True
-                        break
-            if not hit:
-                for note in self.notes:
-                    if not note.get('hit', False) and not note.get('miss', False) and note['type'] != 'roll':
-                        dx = abs(note['x'] - self.judge_x)
-                        if dx <= 45:
-                            if note['type'] == 'left' and key == ord('a'):
-                                note['hit'] = True
-                                self.combo += 1
-                                if dx <= 15:  # perfect
-                                    self.score += 3 + bonus
-                                    self.last_combo_bonus = self.combo
-                                    self.judge_text = ("Perfect", (0,0,255), now + 0.5)
-                                    self.play_sound(self.adrum_sound, 0.25)
-                                elif dx <= 30:  # cool
-                                    self.score += 2 + bonus
-                                    self.last_combo_bonus = self.combo
-                                    self.judge_text = ("Cool", (0,128,255), now + 0.5)
-                                    self.play_sound(self.adrum_sound, 0.5)
-                                else:  # good
-                                    self.score += 1 + bonus
-                                    self.last_combo_bonus = self.combo
-                                    self.judge_text = ("Good", (0,255,255), now + 0.5)
-                                    self.play_sound(self.adrum_sound, 1.0)
-                                hit = True
-                                break
-                            elif note['type'] == 'right' and key == ord('l'):
-                                note['hit'] = True
-                                self.combo += 1
-                                if dx <= 15:
-                                    self.score += 3 + bonus
-                                    self.last_combo_bonus = self.combo
-                                    self.judge_text = ("Perfect", (0,0,255), now + 0.5)
-                                    self.play_sound(self.ldrum_sound, 0.25)
-                                elif dx <= 30:
-                                    self.score += 2 + bonus
-                                    self.last_combo_bonus = self.combo
-                                    self.judge_text = ("Cool", (0,128,255), now + 0.5)
-                                    self.play_sound(self.ldrum_sound, 0.5)
-                                else:
-                                    self.score += 1 + bonus
-                                    self.last_combo_bonus = self.combo
-                                    self.judge_text = ("Good", (0,255,255), now + 0.5)
-                                    self.play_sound(self.ldrum_sound, 1.0)
-                                hit = True
-                                break
-                            else:
-                                note['miss'] = True
-                                self.combo = 0
-                                self.last_combo_bonus = 0
-                                self.play_sound(self.wrong_sound, 1.0)
-                                self.judge_text = ("Miss", (0,0,0), now + 0.5)
-                                if note['type'] == 'left':
-                                    self.miss_banner = (self.a_miss_banner, now + 0.5)
-                                else:
-                                    self.miss_banner = (self.l_miss_banner, now + 0.5)
-                                hit = True
-                                break
         # 如果沒有音符進入判定區，什麼都不做，不 miss，不重置 combo
 
-    def overlay_image(self, background, overlay, x, y):
-        """將 overlay 圖片（含 alpha）貼到 background 上 (左上角 x, y)，自動處理邊界"""
-        h, w = overlay.shape[:2]
-        bg_h, bg_w = background.shape[:2]
-        # 邊界檢查與修正
-        if (x < 0):
-            overlay = overlay[:, -x:]
-            w = overlay.shape[1]
-            x = 0
-        if (y < 0):
-            overlay = overlay[-y:, :]
-            h = overlay.shape[0]
-            y = 0
-        if (x + w > bg_w):
-            overlay = overlay[:, :bg_w - x]
-            w = overlay.shape[1]
-        if (y + h > bg_h):
-            overlay = overlay[:bg_h - y, :]
-            h = overlay.shape[0]
-            y = 0
-        if (w <= 0 or h <= 0):
-            return
-        if (overlay.shape[2] == 4):
-            alpha = overlay[:, :, 3] / 255.0
-            for c in range(3):
-                background[y:y + h, x:x + w, c] = (1 - alpha) * background[y:y + h, x:x + w, c] + alpha * overlay[:, :, c]
-        else:
-            background[y:y + h, x:x + w] = overlay
-
     def draw_text_with_outline(self, img, text, pos, font, font_scale=1.5, color=(255,255,255), thickness=3, outline_color=(0,0,0), outline_thickness=6, mode=None):
         # 只有當 color 沒有特別指定時才根據 mode 設定預設色
         if mode == 'black_white' and color == (255,255,255):
@@ -336,8 +383,7 @@ class TaikoDrum(GameBase):
         elif mode == 'white_black' and color == (255,255,255):
             outline_color = (255,255,255)
             color = (0,0,0)
-        cv2.putText(img, text, pos, font, font_scale, outline_color, outline_thickness, cv2.LINE_AA)
-        cv2.putText(img, text, pos, font, font_scale, color, thickness, cv2.LINE_AA)
+        text_cache.draw(img, text, pos, font, font_scale, color, thickness, outline_color, outline_thickness)
 
     def render(self):
         frame = self.background.copy()
@@ -345,37 +391,35 @@ class TaikoDrum(GameBase):
         center = (self.judge_x, center_y)
         # 顯示右上角剩餘時間
         if self.bgm_length > 0 and self.bgm_start_time is not None:
-            elapsed = time.time() - self.bgm_start_time
+            elapsed = self.song_now
             remain = max(0, int(self.bgm_length - elapsed))
             min_sec = f"{remain//60:02d}:{remain%60:02d}"
             # 根據bgm_path顯示曲名
-            if 'moonlight' in self.bgm_path:
-                song_name = 'moonlight'
-            else:
-                song_name = 'moonheart'
-            self.draw_text_with_outline(frame, f"{song_name} {min_sec}", (self.screen_size[0]-380, 50), self.font, 1.2, (255,225,225), 3, outline_color=(0,0,0), outline_thickness=6)
+            self.draw_text_with_outline(frame, f"{self.song_name} {min_sec}", (self.screen_size[0]-380, 50), self.font, 1.2, (255,225,225), 3, outline_color=(0,0,0), outline_thickness=6)
         # 移除miss音符淡出效果與miss_banner顯示
-        for note in self.notes:
-            if note['type'] == 'roll':
-                y = center_y - 16  # roll條置中, 高度減半
-                h = 32
-                x1 = int(note['x'])
-                roll_len = int(self.note_speed * (note['duration'] * 1000 / 30))
-                x2 = x1 - roll_len
-                color = (255,0,255)
-                # 畫主體矩形（不含頭尾半圓區域）
-                if x1 - h//2 > x2 + h//2:
-                    cv2.rectangle(frame, (x2 + h//2, y), (x1 - h//2, y + h), color, -1)
-                # 畫左側半圓（頭）
-                cv2.ellipse(frame, (x2 + h//2, y + h//2), (h//2, h//2), 0, 90, 270, color, -1)
-                # 畫右側半圓（尾）
-                cv2.ellipse(frame, (x1 - h//2, y + h//2), (h//2, h//2), 0, 270, 450, color, -1)
-                cv2.putText(frame, f"ROLL!", (x1, y-10), self.font, 0.8, color, 2)
-            else:
-                x = int(note['x']) - 40
-                y = center_y - 40  # A/L音符置中
-                img = self.a_circle if note['type'] == 'left' else self.l_circle
-                self.overlay_image(frame, img, x, y)
+        with self.span("blend notes"):
+            notes = self.notes
+            # 依進場順序畫；連續同種類的音符一次交給 blit_sprites
+            for note_type, run in itertools.groupby(notes.visible_slots(), key=lambda slot: notes.type[slot]):
+                if note_type != NOTE_ROLL:
+                    positions = [(int(notes.x[slot]) - 40, center_y - 40) for slot in run]  # A/L音符置中
+                    self.blit_sprites(frame, self.note_sprites[note_type], positions)
+                    continue
+                for slot in run:
+                    y = center_y - 16  # roll條置中, 高度減半
+                    h = 32
+                    x1 = int(notes.x[slot])
+                    roll_len = int(self.scroll_speed * notes.duration[slot])
+                    x2 = x1 - roll_len
+                    color = (255,0,255)
+                    # 畫主體矩形（不含頭尾半圓區域）
+                    if x1 - h//2 > x2 + h//2:
+                        cv2.rectangle(frame, (x2 + h//2, y), (x1 - h//2, y + h), color, -1)
+                    # 畫左側半圓（頭）
+                    cv2.ellipse(frame, (x2 + h//2, y + h//2), (h//2, h//2), 0, 90, 270, color, -1)
+                    # 畫右側半圓（尾）
+                    cv2.ellipse(frame, (x1 - h//2, y + h//2), (h//2, h//2), 0, 270, 450, color, -1)
+                    cv2.putText(frame, f"ROLL!", (x1, y-10), self.font, 0.8, color, 2)
         # 不再顯示miss_banner
         # 顯示評價文字分色
         if self.judge_text:
@@ -391,54 +435,15 @@ class TaikoDrum(GameBase):
             elif text == "Miss":
                 color = (255,255,255)
             self.draw_text_with_outline(frame, text, pos, self.font, 1.5, color, 3, outline_color=(0,0,0), outline_thickness=6)
-        # Score
-        self.draw_text_with_outline(frame, f"Score: {self.score}", (10, 40), self.font, 1.5, (255,255,255), 3, outline_color=(0,0,0), outline_thickness=6)
-        # 畫combo能量條（下方置中加大，100格，彩虹色）
-        max_bar = 100
-        bar_w, bar_h = 8, 48
-        total_bar_w = max_bar * bar_w
-        bar_x = (self.screen_size[0] - total_bar_w) // 2
-        bar_y = self.screen_size[1] - 80
-        # 彩虹色分布（紅->橙->黃->綠->藍->靛->紫)
-        def rainbow_color(i, total):
-            # HSV色環: 0(紅)-255(紫)，i/total*255，避免超出uint8
-            hsv = np.array([int(i/total*255), 255, 255], dtype=np.uint8)
-            rgb = cv2.cvtColor(hsv[np.newaxis, np.newaxis, :], cv2.COLOR_HSV2BGR)[0,0]
-            return int(rgb[0]), int(rgb[1]), int(rgb[2])
-        for i in range(max_bar):
-            color = rainbow_color(i, max_bar-1)
-            if i < self.combo:
-                cv2.rectangle(frame, (bar_x + i*bar_w, bar_y), (bar_x + (i+1)*bar_w - 1, bar_y + bar_h), color, -1)
-            else:
-                cv2.rectangle(frame, (bar_x + i*bar_w, bar_y), (bar_x + (i+1)*bar_w - 1, bar_y + bar_h), (80,80,80), -1)
-        cv2.rectangle(frame, (bar_x, bar_y), (bar_x + total_bar_w, bar_y + bar_h), (255,255,255), 2)
-        # combo加成顯示（置中）
-        if self.combo <= 9:
-            bonus = '0'
-        elif self.combo <= 19:
-            bonus = '1'
-        elif self.combo <= 39:
-            bonus = '2'
-        elif self.combo <= 59:
-            bonus = '3'
-        elif self.combo <= 79:
-            bonus = '4'
-        elif self.combo <= 99:
-            bonus = '5'
-        else:
-            bonus = '10'
-        combo_text = f"Combo: {self.combo}  Bonus: {bonus}"
-        (text_w, text_h), _ = cv2.getTextSize(combo_text, self.font, 1.5, 3)
-        combo_x = (self.screen_size[0] - text_w) // 2
-        combo_y = bar_y - 20
-        self.draw_text_with_outline(frame, combo_text, (combo_x, combo_y), self.font, 1.5, (255,255,255), 3, outline_color=(0,0,0), outline_thickness=6)
-        cv2.imshow(WINDOW_NAME, frame)
+        with self.span("hud"):
+            self.hud.draw(frame, self.score, self.combo, self.get_bonus())
+        return frame
 
     def show_result(self):
         # 使用 taikodrum_diff_select.png 作為背景
-        bg_img = cv2.imread("taikodrum_diff_select.png")
+        bg_img = assets.load_image("taikodrum_diff_select.png", (800, 600), interpolation=cv2.INTER_LINEAR)
         if bg_img is not None:
-            frame = cv2.resize(bg_img, (800, 600))
+            frame = bg_img.copy()
         else:
             frame = np.ones((600, 800, 3), dtype=np.uint8) * 30
         # 左2/5區塊半透明白色背景
@@ -461,22 +466,10 @@ class TaikoDrum(GameBase):
         # Game Over!頂部顯示
         go_text, go_scale, go_color = lines[0]
         # 換行處理
-        go_words = go_text.split(' ')
-        go_lines = []
-        line = ''
-        for word in go_words:
-            test_line = (line + ' ' + word).strip()
-            (w, h), _ = cv2.getTextSize(test_line, self.font, go_scale, 3)
-            if w > content_w - 40 and line != '':
-                go_lines.append(line)
-                line = word
-            else:
-                line = test_line
-        if line:
-            go_lines.append(line)
+        go_lines = wrap_text(go_text, self.font, go_scale, 3, content_w - 40)
         go_y = content_y + 40
         for go_line in go_lines:
-            (go_w, go_h), _ = cv2.getTextSize(go_line, self.font, go_scale, 3)
+            (go_w, go_h), _ = measure_text(go_line, self.font, go_scale, 3)
             go_x = content_x + (content_w - go_w) // 2
             self.draw_text_with_outline(frame, go_line, (go_x, go_y + go_h), self.font, go_scale, go_color, 3, outline_color=(0,0,0), outline_thickness=6)
             go_y += go_h + 18
@@ -484,36 +477,25 @@ class TaikoDrum(GameBase):
         info_lines = lines[1:]
         rendered_lines = []
         for text, scale, color in info_lines:
-            words = text.split(' ')
-            line = ''
-            for word in words:
-                test_line = (line + ' ' + word).strip()
-                (w, h), _ = cv2.getTextSize(test_line, self.font, scale, 3)
-                if w > content_w - 40 and line != '':
-                    rendered_lines.append((line, scale, color))
-                    line = word
-                else:
-                    line = test_line
-            if line:
+            for line in wrap_text(text, self.font, scale, 3, content_w - 40):
                 rendered_lines.append((line, scale, color))
         # 新增：Leaderboard 行
         leaderboard_text = "Leaderboard ->"
         leaderboard_scale = 1.0
         leaderboard_color = (120, 120, 255)
-        (w, h), _ = cv2.getTextSize(leaderboard_text, self.font, leaderboard_scale, 3)
         rendered_lines.append((leaderboard_text, leaderboard_scale, leaderboard_color))
         # 計算分數與Max Combo+Leaderboard總高度
         total_height = 0
         heights = []
         for text, scale, _ in rendered_lines:
-            (w, h), _ = cv2.getTextSize(text, self.font, scale, 3)
+            (w, h), _ = measure_text(text, self.font, scale, 3)
             heights.append(h + 18)
             total_height += h + 18
         # 垂直至中（不含Game Over!）
         start_y = content_y + (content_h - total_height) // 2
         y = start_y
         for idx, (text, scale, color) in enumerate(rendered_lines):
-            (w, h), _ = cv2.getTextSize(text, self.font, scale, 3)
+            (w, h), _ = measure_text(text, self.font, scale, 3)
             x = content_x + (content_w - w) // 2
             if y + h > content_y + content_h - 50:
                 break
@@ -540,222 +522,128 @@ class TaikoDrum(GameBase):
         press_text = "Press any key to return to menu"
         press_scale = 1
         # 自動換行
-        press_words = press_text.split(' ')
-        press_lines = []
-        line = ''
-        for word in press_words:
-            test_line = (line + ' ' + word).strip()
-            (w, h), _ = cv2.getTextSize(test_line, self.font, press_scale, 3)
-            if w > content_w - 40 and line != '':
-                press_lines.append(line)
-                line = word
-            else:
-                line = test_line
-        if line:
-            press_lines.append(line)
+        press_lines = wrap_text(press_text, self.font, press_scale, 3, content_w - 40)
         # 計算總高度
         total_press_height = 0
         press_heights = []
         for text in press_lines:
-            (w, h), _ = cv2.getTextSize(text, self.font, press_scale, 3)
+            (w, h), _ = measure_text(text, self.font, press_scale, 3)
             press_heights.append(h + 8)
             total_press_height += h + 8
         # 最底部對齊
         press_y = content_y + content_h - 30 - total_press_height + 8
         for idx, text in enumerate(press_lines):
-            (w, h), _ = cv2.getTextSize(text, self.font, press_scale, 3)
+            (w, h), _ = measure_text(text, self.font, press_scale, 3)
             press_x = content_x + (content_w - w) // 2
             self.draw_text_with_outline(frame, text, (press_x, press_y + h), self.font, press_scale, (200,255,255), 3, outline_color=(0,0,0), outline_thickness=6)
             press_y += press_heights[idx]
-        cv2.imshow(WINDOW_NAME, frame)
-        cv2.waitKey(0)
-
-    def show_difficulty_menu(self):
-        # 嘗試載入 taikodrum_diff_select.png 作為背景
-        bg_img = cv2.imread("taikodrum_diff_select.png")
-        if bg_img is not None:
-            img = cv2.resize(bg_img, self.screen_size)
-        else:
-            img = np.ones((self.screen_size[1], self.screen_size[0], 3), dtype=np.uint8) * 30
-        def draw_text_with_outline(img, text, pos, font, font_scale, color, thickness=3, outline_color=(0,0,0), outline_thickness=6):
-            cv2.putText(img, text, pos, font, font_scale, outline_color, outline_thickness, cv2.LINE_AA)
-            cv2.putText(img, text, pos, font, font_scale, color, thickness, cv2.LINE_AA)
-        # y座標分別為265, 295, 525
-        draw_text_with_outline(img, "1. Easy (Slow)", (385, 265), self.font, 1.0, (0,255,0), 3)
-        draw_text_with_outline(img, "2. Normal (Medium)", (385, 395), self.font, 1.0, (255,255,0), 3)
-        draw_text_with_outline(img, "3. Difficult (Fast)", (385, 525), self.font, 1.0, (255,0,0), 3)
-        draw_text_with_outline(img, "ESC to back", (125, 650), self.font, 1, (180,180,180), 2)
-        cv2.imshow(WINDOW_NAME, img)
-
-    def show_music_menu(self):
-        # 使用 taikodrum_diff_select.png 作為背景
-        bg_img = cv2.imread("taikodrum_diff_select.png")
-        if bg_img is not None:
-            img = cv2.resize(bg_img, self.screen_size)
-        else:
-            img = np.ones((self.screen_size[1], self.screen_size[0], 3), dtype=np.uint8) * 30
-        def draw_text_with_outline(img, text, pos, font, font_scale, color, thickness=3, outline_color=(0,0,0), outline_thickness=6):
-            cv2.putText(img, text, pos, font, font_scale, outline_color, outline_thickness, cv2.LINE_AA)
-            cv2.putText(img, text, pos, font, font_scale, color, thickness, cv2.LINE_AA)
-        # y座標分別為265, 295, 525
-        draw_text_with_outline(img, "Song Select", (385, 265), self.font, 1.0, (255,255,255), 3)
-        draw_text_with_outline(img, "1. Moon Heart", (385, 395), self.font, 1.0, (255,200,200), 3)
-        draw_text_with_outline(img, "2. Moonlight", (385, 525), self.font, 1.0, (200,200,255), 3)
-        draw_text_with_outline(img, "ESC to back", (125, 650), self.font, 1, (180,180,180), 2)
-        cv2.imshow(WINDOW_NAME, img)
-
-    def show_crush_question(self):
-        # 使用 taikodrum_diff_select.png 作為背景
-        bg_img = cv2.imread("taikodrum_diff_select.png")
-        if bg_img is not None:
-            img = cv2.resize(bg_img, self.screen_size)
-        else:
-            img = np.ones((self.screen_size[1], self.screen_size[0], 3), dtype=np.uint8) * 30
-        def draw_text_with_outline(img, text, pos, font, font_scale, color, thickness=3, outline_color=(0,0,0), outline_thickness=6):
-            cv2.putText(img, text, pos, font, font_scale, outline_color, outline_thickness, cv2.LINE_AA)
-            cv2.putText(img, text, pos, font, font_scale, color, thickness, cv2.LINE_AA)
-        # y座標分別為265, 295, 525
-        draw_text_with_outline(img, "Crush watching?", (385, 265), self.font, 1.0, (255,255,255), 3)
-        draw_text_with_outline(img, "1. Yes", (385, 395), self.font, 1.0, (255,255,0), 3)
-        draw_text_with_outline(img, "2. No", (385, 525), self.font, 1.0, (255,255,0), 3)
-        cv2.imshow(WINDOW_NAME, img)
+        self.display.present(frame)
+        self.input_queue.clear()
+        # 等任意鍵；沒有真人輸入的顯示（HeadlessDisplay）不會再有按鍵，讀完已注入的就離開
+        while self.read_key(100) == NO_KEY:
+            if not getattr(self.display, 'interactive', True):
+                break
 
-    def main_loop(self):
+    def main_loop(self, target_fps=DEFAULT_TARGET_FPS):
         # 不再呼叫 cv2.namedWindow，主程式已建立
-        selecting_difficulty = True
-        while selecting_difficulty:
-            self.show_difficulty_menu()
-            key = cv2.waitKey(10) & 0xFF
-            if key == 27:  # ESC
-                self.play_select_sound()
-                return  # 返回主選單
-            elif key == ord('1'):
-                self.play_select_sound()
-                self.note_speed = 2
-                self.group_interval = 2.5
-                selecting_difficulty = False
-            elif key == ord('2'):
-                self.play_select_sound()
-                self.note_speed = 4
-                self.group_interval = 1.5
-                selecting_difficulty = False
-            elif key == ord('3'):
-                self.play_select_sound()
-                self.note_speed = 7
-                self.group_interval = 1.2
-                selecting_difficulty = False
+        # 選單畫面只畫一次，等待按鍵時不重畫
+        key = self.menus['difficulty'].choose(self.display, self.input_queue, (27, ord('1'), ord('2'), ord('3')))
+        self.play_select_sound()
+        if key == 27:  # ESC
+            return  # 返回主選單
+        self.set_difficulty(self.DIFFICULTY_KEYS[key])
         # 新增：音樂選擇
-        selecting_music = True
-        while selecting_music:
-            self.show_music_menu()
-            key = cv2.waitKey(10) & 0xFF
-            if key == 27:  # ESC
-                self.play_select_sound()
-                return  # 返回主選單
-            elif key == ord('1'):
-                self.play_select_sound()
-                self.bgm_path = "bgm_moonheart.wav"
-                try:
-                    bgm_sound = pygame.mixer.Sound(self.bgm_path)
-                    self.bgm_length = bgm_sound.get_length()
-                except Exception as e:
-                    print(f"警告：背景音樂載入失敗: {e}")
-                    self.bgm_length = 0
-                selecting_music = False
-            elif key == ord('2'):
-                self.play_select_sound()
-                self.bgm_path = "bgm_moonlight.wav"
-                try:
-                    bgm_sound = pygame.mixer.Sound(self.bgm_path)
-                    self.bgm_length = bgm_sound.get_length()
-                except Exception as e:
-                    print(f"警告：背景音樂載入失敗: {e}")
-                    self.bgm_length = 0
-                selecting_music = False
+        song_keys = tuple(ord(str(i + 1)) for i in range(len(self.songs)))
+        key = self.menus['music'].choose(self.display, self.input_queue, (27,) + song_keys)
+        self.play_select_sound()
+        if key == 27:  # ESC
+            return  # 返回主選單
+        self.select_song(self.songs[song_keys.index(key)]['path'])
         # 新增：詢問 crush 是否在看
-        selecting_crush = True
         self.crush_mode = False  # 新增：記錄crush模式
-        while selecting_crush:
-            self.show_crush_question()
-            key = cv2.waitKey(10) & 0xFF
-            if key == ord('1'):
-                self.play_select_sound()
-                self.crush_mode = True
-                selecting_crush = False
-            elif key == ord('2'):
-                self.play_select_sound()
-                self.crush_mode = False
-                selecting_crush = False
-            elif key == 27:  # ESC
-                self.play_select_sound()
-                return  # 返回主選單
-        # 播放背景音樂
+        key = self.menus['crush'].choose(self.display, self.input_queue, (27, ord('1'), ord('2')))
+        self.play_select_sound()
+        if key == 27:  # ESC
+            return  # 返回主選單
+        self.crush_mode = key == ord('1')
+        # 播放背景音樂；沒有音樂時歌曲時間就從這裡開始用 perf_counter 計算
+        self.song_clock.start()
         if self.bgm_length > 0:
             try:
                 pygame.mixer.music.load(self.bgm_path)
                 pygame.mixer.music.play()
                 self.bgm_start_time = time.time()
+                self.song_clock.start(use_music=True)
             except Exception as e:
                 print(f"背景音樂播放失敗: {e}")
                 self.bgm_start_time = None
         else:
             self.bgm_start_time = None
-        # 遊戲主循環
+        # 遊戲主循環：update 以固定 tick 前進，畫面依 target_fps 更新
         self.max_combo = 0
-        auto_roll_timer = 0
-        auto_roll_last = 0
-        auto_roll_key = 'a'  # 交替A/L
+        self.auto_roll_last = 0
+        self.auto_roll_key = 'a'  # 交替A/L
+        loop = GameLoop(self.tick_rate, target_fps)
+        self.input_queue.clear()
         while True:
-            self.update()
-            # crush模式自動判定
-            if self.crush_mode:
-                now = time.time()
-                bonus = self.get_bonus()
-                # 處理普通音符
-                for note in self.notes:
-                    if note['type'] != 'roll' and not note.get('hit', False) and not note.get('miss', False):
-                        dx = abs(note['x'] - self.judge_x)
-                        if dx <= 15:
-                            note['hit'] = True
-                            self.combo += 1
-                            self.score += 3 + bonus
-                            self.last_combo_bonus = self.combo
-                            self.judge_text = ("Perfect", (0,0,255), now + 0.5)
-                            if note['type'] == 'left':
-                                self.play_sound(self.adrum_sound, 0.25)
-                            else:
-                                self.play_sound(self.ldrum_sound, 0.25)
-                    if note['type'] == 'roll' and note.get('roll_active', False):
-                        roll_left = min(note['x'], note['end_x'])
-                        roll_right = max(note['x'], note['end_x'])
-                        if roll_left - 45 <= self.judge_x <= roll_right + 45:
-                            if now - auto_roll_last > 0.1:
-                                note['roll_hits'] += 1
-                                self.combo += 1
-                                self.score += 3 + bonus
-                                self.last_combo_bonus = self.combo
-                                self.judge_text = ("Perfect", (0,0,255), now + 0.2)
-                                if auto_roll_key == 'a':
-                                    self.play_sound(self.adrum_sound, 0.25)
-                                    auto_roll_key = 'l'
-                                else:
-                                    self.play_sound(self.ldrum_sound, 0.25)
-                                    auto_roll_key = 'a'
-                                auto_roll_last = now
-            self.render()
-            if self.combo > getattr(self, 'max_combo', 0):
-                self.max_combo = self.combo
+            loop.run_updates(self.step)
+            if loop.should_render():
+                self.display.present(self.draw_perf_overlay(self.timed_render()))
             # 判斷剩餘時間
             if self.bgm_length > 0 and self.bgm_start_time is not None:
-                elapsed = time.time() - self.bgm_start_time
+                elapsed = self.song_clock.now()
                 if elapsed >= self.bgm_length:
                     break
-            key = cv2.waitKey(10) & 0xFF
-            if key == 27:  # ESC
+            elif self.chart_finished():
+                # 沒有音樂時，譜面打完就結束
+                break
+            # 一幀內的所有按鍵整批判定，各自用實際按下的時間
+            self.input_queue.poll(self.display, loop.wait_ms())
+            events = self.input_queue.drain()
+            if any(e.type == pygame.KEYDOWN and e.key == 27 for e in events):  # ESC
                 break
             if not self.crush_mode:
-                if key != 255:
-                    self.handle_event(key)
+                self.timed_handle_events(events)
             # crush模式下A/L無效，只能ESC
         pygame.mixer.music.stop()
         self.show_result()
+
+    def step(self):
+        # 一個固定 tick：移動音符，crush 模式下順便自動判定
+        self.timed_update()
+        if self.crush_mode:
+            with self.span("auto play"):
+                self.auto_play()
+        if self.combo > getattr(self, 'max_combo', 0):
+            self.max_combo = self.combo
+
+    def auto_play(self):
+        # crush模式自動判定
+        now = self.clock()
+        bonus = self.get_bonus()
+        notes = self.notes
+        # 處理普通音符：判定窗內的一次全部取出
+        for slot in notes.notes_within(self.judge_x, 15):
+            notes.state[slot] = HIT
+            self.combo += 1
+            self.score += 3 + bonus
+            self.last_combo_bonus = self.combo
+            self.judge("Perfect", (0,0,255), now + 0.5)
+            if notes.type[slot] == NOTE_LEFT:
+                self.play_sound(self.adrum_sound, 0.25)
+            else:
+                self.play_sound(self.ldrum_sound, 0.25)
+        slot = notes.find_roll(self.judge_x, self.scroll_speed)
+        if slot >= 0 and now - self.auto_roll_last > 0.1:
+            notes.roll_hits[slot] += 1
+            self.combo += 1
+            self.score += 3 + bonus
+            self.last_combo_bonus = self.combo
+            self.judge("Perfect", (0,0,255), now + 0.2, tally='Roll')
+            if self.auto_roll_key == 'a':
+                self.play_sound(self.adrum_sound, 0.25)
+                self.auto_roll_key = 'l'
+            else:
+                self.play_sound(self.ldrum_sound, 0.25)
+                self.auto_roll_key = 'a'
+            self.auto_roll_last = now
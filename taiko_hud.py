@@ -0,0 +1,81 @@
+import cv2
+import numpy as np
+
+from sprite_blit import blit
+from text_cache import measure_text, text_cache
+
+
+class TaikoHud:
+    """太鼓的分數、combo 條與 combo 文字：底圖一次建好，數值改變時才重畫文字"""
+
+    max_bar = 100
+    bar_w, bar_h = 8, 48
+    text_style = dict(font_scale=1.5, color=(255, 255, 255), thickness=3,
+                      outline_color=(0, 0, 0), outline_thickness=6)
+
+    def __init__(self, background, screen_size, font):
+        self.screen_size = screen_size
+        self.font = font
+        total_bar_w = self.max_bar * self.bar_w
+        self.bar_x = (screen_size[0] - total_bar_w) // 2
+        self.bar_y = screen_size[1] - 80
+        self._build_bar(background, total_bar_w)
+        self._score = None
+        self._score_text = None
+        self._combo_key = None
+        self._combo_text = None
+        self._combo_x = 0
+
+    def _build_bar(self, background, total_bar_w):
+        # 全滿與全空兩張 combo 條（含白框與周圍的背景），每幀只要兩次切片複製
+        colors = self.rainbow_colors(self.max_bar)
+        full = background.copy()
+        empty = background.copy()
+        for i in range(self.max_bar):
+            x0 = self.bar_x + i * self.bar_w
+            x1 = self.bar_x + (i + 1) * self.bar_w - 1
+            cv2.rectangle(full, (x0, self.bar_y), (x1, self.bar_y + self.bar_h), colors[i], -1)
+            cv2.rectangle(empty, (x0, self.bar_y), (x1, self.bar_y + self.bar_h), (80, 80, 80), -1)
+        for img in (full, empty):
+            cv2.rectangle(img, (self.bar_x, self.bar_y), (self.bar_x + total_bar_w, self.bar_y + self.bar_h),
+                          (255, 255, 255), 2)
+        # 框線寬 2，會往外多畫 1px；多留一點邊
+        self.bar_rect = (max(self.bar_x - 2, 0), max(self.bar_y - 2, 0),
+                         min(self.bar_x + total_bar_w + 3, background.shape[1]),
+                         min(self.bar_y + self.bar_h + 3, background.shape[0]))
+        x0, y0, x1, y1 = self.bar_rect
+        self.bar_full = full[y0:y1, x0:x1].copy()
+        self.bar_empty = empty[y0:y1, x0:x1].copy()
+
+    @staticmethod
+    def rainbow_colors(count):
+        # 彩虹色分布（紅->橙->黃->綠->藍->靛->紫)，100 格一次轉完
+        hue = (np.arange(count) / (count - 1) * 255).astype(np.uint8)
+        hsv = np.stack([hue, np.full(count, 255, np.uint8), np.full(count, 255, np.uint8)], axis=1)
+        bgr = cv2.cvtColor(hsv[np.newaxis], cv2.COLOR_HSV2BGR)[0]
+        return [tuple(int(c) for c in color) for color in bgr]
+
+    def draw(self, frame, score, combo, bonus):
+        if score != self._score:
+            self._score = score
+            self._score_text = text_cache.sprite(f"Score: {score}", self.font, **self.text_style)
+        if (combo, bonus) != self._combo_key:
+            self._combo_key = (combo, bonus)
+            combo_text = f"Combo: {combo}  Bonus: {bonus}"
+            self._combo_text = text_cache.sprite(combo_text, self.font, **self.text_style)
+            (text_w, _), _ = measure_text(combo_text, self.font, self.text_style['font_scale'],
+                                          self.text_style['thickness'])
+            self._combo_x = (self.screen_size[0] - text_w) // 2
+        # Score
+        sprite, (dx, dy) = self._score_text
+        blit(frame, sprite, 10 + dx, 40 + dy)
+        # combo 條：先貼全空，再貼已填滿的那一段
+        x0, y0, x1, y1 = self.bar_rect
+        frame[y0:y1, x0:x1] = self.bar_empty
+        filled = self.bar_x - x0 + min(combo, self.max_bar) * self.bar_w
+        if combo > 0:
+            frame[y0:y1, x0:x0 + filled] = self.bar_full[:, :filled]
+        # combo加成顯示（置中）
+        sprite, (dx, dy) = self._combo_text
+        blit(frame, sprite, self._combo_x + dx, self.bar_y - 20 + dy)
+        return frame
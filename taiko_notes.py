@@ -0,0 +1,154 @@
+from collections import deque
+
+import numpy as np
+
+# 音符種類
+NOTE_LEFT = 0   # A（紅）
+NOTE_RIGHT = 1  # L（藍）
+NOTE_ROLL = 2
+TYPE_CODES = {'left': NOTE_LEFT, 'right': NOTE_RIGHT, 'roll': NOTE_ROLL}
+
+# 槽位狀態
+FREE = 0     # 空槽，可重複使用
+ACTIVE = 1   # 還能判定（roll 表示還在連打區間內）
+MISSED = 2   # 已 miss，繼續往左捲出畫面
+HIT = 3      # 已擊中，下一次 update 時回收
+
+# 判定用的 lane：A/L 共用一條（按錯鍵也算判定到），roll 一條
+LANE_DRUM = 0
+LANE_ROLL = 1
+
+
+class NoteStore:
+    """畫面上的太鼓音符，以 numpy 陣列（structure of arrays）存放；移動、miss 判定與回收都是向量化運算"""
+
+    def __init__(self, capacity=64):
+        self.time = np.zeros(capacity)          # x 對齊判定圓的歌曲時間（roll 為尾端）
+        self.duration = np.zeros(capacity)      # roll 長度（秒）
+        self.x = np.zeros(capacity)
+        self.type = np.zeros(capacity, dtype=np.int8)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.roll_hits = np.zeros(capacity, dtype=np.int32)
+        self.serial = np.zeros(capacity, dtype=np.int64)  # 每次 spawn 遞增，用來辨認 lane 裡過期的槽位
+        self._next_serial = 1
+        # 每條 lane 依時間排序的 (slot, serial)；判定時從最前面找，已判定的從左邊丟掉
+        self._lanes = (deque(), deque())
+        self._free = list(range(capacity - 1, -1, -1))  # 空槽堆疊，pop() 取最小的索引
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.state[:] = FREE
+        for lane in self._lanes:
+            lane.clear()
+        self._free = list(range(len(self.state) - 1, -1, -1))
+        self.count = 0
+
+    def _grow(self):
+        old = len(self.state)
+        for name in ('time', 'duration', 'x', 'type', 'state', 'roll_hits', 'serial'):
+            array = getattr(self, name)
+            grown = np.zeros(old * 2, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+        self._free.extend(range(old * 2 - 1, old - 1, -1))
+
+    def spawn(self, time, type_, duration=0.0, x=0.0):
+        # 必須依時間順序 spawn（譜面游標本來就是），lane 才會維持排序
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        self.time[slot] = time
+        self.duration[slot] = duration
+        self.x[slot] = x
+        self.type[slot] = type_
+        self.state[slot] = ACTIVE
+        self.roll_hits[slot] = 0
+        self.serial[slot] = self._next_serial
+        self._lanes[LANE_ROLL if type_ == NOTE_ROLL else LANE_DRUM].append((slot, self._next_serial))
+        self._next_serial += 1
+        self.count += 1
+        return slot
+
+    def _lane(self, lane_id):
+        # 丟掉最前面已經判定或回收的音符，均攤 O(1)
+        lane = self._lanes[lane_id]
+        while lane:
+            slot, serial = lane[0]
+            if self.serial[slot] == serial and self.state[slot] == ACTIVE:
+                break
+            lane.popleft()
+        return lane
+
+    def _judgeable(self, slot, serial):
+        return self.serial[slot] == serial and self.state[slot] == ACTIVE
+
+    def update(self, song_time, judge_x, scroll_speed, miss_margin=30, roll_margin=45):
+        # 回傳 (這次 miss 的音符槽位, 這次結束的 roll 槽位)；槽位在下一次 update 前不會被重用
+        live = self.state != FREE
+        np.multiply(self.time - song_time, scroll_speed, out=self.x)
+        self.x += judge_x
+        active = self.state == ACTIVE
+        is_roll = self.type == NOTE_ROLL
+        missed = active & ~is_roll & (self.x < judge_x - miss_margin)
+        finished_rolls = active & is_roll & (self.x < judge_x - roll_margin)
+        self.state[missed] = MISSED
+        # 回收：擊中的、結束的 roll、捲出畫面的
+        done = live & ((self.state == HIT) | finished_rolls | (self.x <= 0))
+        missed_slots = np.flatnonzero(missed)
+        roll_slots = np.flatnonzero(finished_rolls)
+        freed = np.flatnonzero(done)
+        if len(freed):
+            self.state[freed] = FREE
+            self.count -= len(freed)
+            self._free.extend(freed[::-1].tolist())
+        return missed_slots, roll_slots
+
+    def end_x(self, slot, scroll_speed):
+        return self.x[slot] - scroll_speed * self.duration[slot]
+
+    def visible_slots(self):
+        # 依時間排序（先進場的先畫），只包含還沒回收的槽位
+        slots = np.flatnonzero(self.state != FREE)
+        return slots[np.argsort(self.time[slots], kind='stable')]
+
+    def find_roll(self, judge_x, scroll_speed, offset=0.0, margin=45):
+        # 判定圓落在哪一條還在進行中的 roll 上，沒有就回傳 -1
+        for slot, serial in self._lane(LANE_ROLL):
+            if not self._judgeable(slot, serial):
+                continue
+            right = self.x[slot] - offset
+            if right + margin < judge_x:
+                continue  # 已經過去，下一次 update 會結束它
+            left = right - scroll_speed * self.duration[slot]
+            return slot if left - margin <= judge_x else -1
+        return -1
+
+    def find_note(self, judge_x, offset=0.0, window=45):
+        # 判定窗內最早的一般音符，回傳 (槽位, 距離)；沒有就回傳 (-1, None)
+        # lane 依時間排序：跳過已經超過判定窗的，遇到第一個還沒到的就可以停
+        for slot, serial in self._lane(LANE_DRUM):
+            if not self._judgeable(slot, serial):
+                continue
+            dx = self.x[slot] - offset - judge_x
+            if dx < -window:
+                continue
+            if dx <= window:
+                return slot, float(abs(dx))
+            break
+        return -1, None
+
+    def notes_within(self, judge_x, window):
+        # 判定窗內所有還沒判定的一般音符（自動演奏用）
+        slots = []
+        for slot, serial in self._lane(LANE_DRUM):
+            if not self._judgeable(slot, serial):
+                continue
+            dx = self.x[slot] - judge_x
+            if dx > window:
+                break
+            if dx >= -window:
+                slots.append(slot)
+        return slots
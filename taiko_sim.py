@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+# 不開視窗、不出聲音，必須在 import pygame 之前設定
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+from input_events import InputEvent
+from song_clock import SongClock
+from taiko_chart import generate_chart
+
+RANDOM_SONG = 'random'  # 不用譜面檔，每個 seed 產生一份隨機譜面
+JUDGEMENTS = ('Perfect', 'Cool', 'Good', 'Miss', 'Roll')
+ROLL_RATE = 8.0  # 模擬玩家連打的速度（次/秒）
+
+
+class VirtualClock:
+    # 模擬用的時鐘：只有 advance() 時才前進，不必真的等待
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+    def advance(self, dt):
+        self.t += dt
+
+
+_game = None  # 每個 worker 行程只建一次遊戲（載入圖片與音效），之後每次模擬都 reset_session
+
+
+def _get_game():
+    global _game
+    if _game is None:
+        from display import HeadlessDisplay
+        from taiko_drum import TaikoDrum
+        _game = TaikoDrum(display=HeadlessDisplay())
+        _game.muted = True
+    return _game
+
+
+def human_presses(track, rng, jitter, miss_rate):
+    # 模擬玩家：每個音符在擊打時刻加上常態分布的誤差按下正確的鍵，有 miss_rate 的機率漏按；
+    # roll 以 ROLL_RATE 左右交替連打
+    presses = []
+    roll_keys = (ord('a'), ord('l'))
+    for note in track.notes:
+        if note['type'] == 'roll':
+            hits = int(note['duration'] * ROLL_RATE) + 1
+            for i in range(hits):
+                presses.append((note['start'] + i / ROLL_RATE + rng.gauss(0, jitter), roll_keys[i % 2]))
+        elif rng.random() >= miss_rate:
+            key = ord('a') if note['type'] == 'left' else ord('l')
+            presses.append((note['time'] + rng.gauss(0, jitter), key))
+    presses.sort()
+    return presses
+
+
+def simulate(spec):
+    # 以虛擬時鐘跑完一首歌，用的是遊戲本身的 update / auto_play / handle_event
+    # spec: song, difficulty, seed, player('auto'|'human'), jitter, miss_rate,
+    #       以及可選的 scroll_speed, group_interval, roll_chance, length
+    started = time.perf_counter()
+    game = _get_game()
+    clock = VirtualClock()
+    game.clock = clock
+    game.song_clock = SongClock(clock=clock, music_pos=lambda: -1)
+    game.reset_session()
+    song = spec.get('song', RANDOM_SONG)
+    difficulty = spec.get('difficulty', 'normal')
+    if song != RANDOM_SONG:
+        game.select_song(song)
+    game.set_difficulty(difficulty)
+    if spec.get('scroll_speed'):
+        game.scroll_speed = spec['scroll_speed']
+    rng = random.Random(spec.get('seed'))
+    if song == RANDOM_SONG or spec.get('group_interval') or spec.get('roll_chance') is not None:
+        # 調整譜面參數時改用隨機譜面；長度沿用歌曲長度
+        from taiko_drum import RANDOM_CHART_LENGTH
+        interval = spec.get('group_interval') or game.DIFFICULTY_SETTINGS[difficulty][1]
+        length = spec.get('length') or (game.bgm_length if song != RANDOM_SONG else 0) or RANDOM_CHART_LENGTH
+        roll_chance = spec.get('roll_chance')
+        chart = generate_chart(song, length, {difficulty: interval}, seed=rng.random(),
+                               roll_chance=0.1 if roll_chance is None else roll_chance)
+        game.chart_track = chart.track(difficulty)
+        game.chart_idx = 0
+    player = spec.get('player', 'auto')
+    game.crush_mode = player == 'auto'
+    game.max_combo = 0
+    game.auto_roll_last = float('-inf')
+    game.auto_roll_key = 'a'
+    presses = deque()
+    if player == 'human':
+        presses.extend(human_presses(game.chart_track, rng, spec.get('jitter', 0.02), spec.get('miss_rate', 0.0)))
+    # 最後一個音符經過判定圓後，還要再捲出畫面才會回收
+    limit = game.chart_track.end_time + game.judge_x / game.scroll_speed + 5.0
+    dt = 1.0 / game.tick_rate
+    while not game.chart_finished() and clock.t < limit:
+        clock.advance(dt)
+        game.step()
+        # 與 main_loop 一樣：tick 之後才處理這段時間內的按鍵，各自用按下的時間判定
+        while presses and presses[0][0] <= clock.t:
+            press_time, key = presses.popleft()
+            game.handle_event(InputEvent(pygame.KEYDOWN, key=key, time_=press_time))
+    result = dict(spec)
+    result.update({
+        'score': game.score,
+        'max_combo': game.max_combo,
+        'notes': len(game.chart_track),
+        'judgements': {name: game.judgements.get(name, 0) for name in JUDGEMENTS},
+        'song_time': round(clock.t, 3),
+        'wall_time': round(time.perf_counter() - started, 4),
+    })
+    return result
+
+
+def run_batch(specs, workers=None):
+    # workers=1 時直接在這個行程跑，方便除錯
+    if workers == 1:
+        return [simulate(spec) for spec in specs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(simulate, specs, chunksize=max(1, len(specs) // ((workers or os.cpu_count()) * 4))))
+
+
+def summarize(results):
+    # 依 (歌曲, 難度, 參數) 分組：分數平均/標準差/最小/最大、平均最大 combo、判定比例
+    groups = {}
+    for r in results:
+        key = tuple((k, r.get(k)) for k in ('song', 'difficulty', 'player', 'scroll_speed', 'group_interval',
+                                            'roll_chance', 'jitter', 'miss_rate') if r.get(k) is not None)
+        groups.setdefault(key, []).append(r)
+    summary = []
+    for key, runs in groups.items():
+        scores = [r['score'] for r in runs]
+        totals = Counter()
+        for r in runs:
+            totals.update(r['judgements'])
+        judged = sum(totals.values()) or 1
+        summary.append({
+            **dict(key),
+            'runs': len(runs),
+            'score_mean': statistics.fmean(scores),
+            'score_stdev': statistics.pstdev(scores),
+            'score_min': min(scores),
+            'score_max': max(scores),
+            'max_combo_mean': statistics.fmean(r['max_combo'] for r in runs),
+            'judgements': {name: totals[name] / judged for name in JUDGEMENTS},
+        })
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="不開視窗、不出聲音，以虛擬時鐘快速模擬太鼓自動演奏，統計分數與判定分布")
+    parser.add_argument('--songs', nargs='*', help="音樂檔路徑或 random（預設：歌曲庫裡的所有歌）")
+    parser.add_argument('--difficulties', nargs='*', default=['easy', 'normal', 'hard'])
+    parser.add_argument('--seeds', type=int, default=1, help="每組跑幾個 seed（0..N-1）")
+    parser.add_argument('--player', choices=('auto', 'human'), default='auto',
+                        help="auto: crush 模式的自動演奏；human: 有時間誤差的模擬玩家")
+    parser.add_argument('--jitter', type=float, default=0.02, help="human 模式按鍵時間誤差的標準差（秒）")
+    parser.add_argument('--miss-rate', type=float, default=0.0, help="human 模式漏按的機率")
+    parser.add_argument('--scroll-speed', type=float, nargs='*', help="覆寫音符速度（每秒像素），可給多個值")
+    parser.add_argument('--group-interval', type=float, nargs='*', help="改用隨機譜面並指定 group 間隔（秒）")
+    parser.add_argument('--roll-chance', type=float, nargs='*', help="改用隨機譜面並指定 roll 出現機率")
+    parser.add_argument('--length', type=float, help="隨機譜面長度（秒）")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--out', help="把每一次模擬的結果寫成 JSON")
+    args = parser.parse_args(argv)
+
+    songs = args.songs
+    if not songs:
+        from song_library import song_library
+        songs = [song['path'] for song in song_library.songs()] or [RANDOM_SONG]
+    specs = []
+    for song in songs:
+        for difficulty in args.difficulties:
+            for speed in args.scroll_speed or [None]:
+                for interval in args.group_interval or [None]:
+                    for roll_chance in args.roll_chance or [None]:
+                        for seed in range(args.seeds):
+                            spec = {'song': song, 'difficulty': difficulty, 'seed': seed, 'player': args.player,
+                                    'scroll_speed': speed, 'group_interval': interval,
+                                    'roll_chance': roll_chance, 'length': args.length}
+                            if args.player == 'human':
+                                spec.update(jitter=args.jitter, miss_rate=args.miss_rate)
+                            specs.append({k: v for k, v in spec.items() if v is not None})
+    started = time.perf_counter()
+    results = run_batch(specs, args.workers)
+    elapsed = time.perf_counter() - started
+    for row in summarize(results):
+        params = "  ".join(f"{k}={row[k]}" for k in ('song', 'difficulty', 'scroll_speed', 'group_interval',
+                                                      'roll_chance') if k in row)
+        dist = " ".join(f"{name} {row['judgements'][name] * 100:4.1f}%" for name in JUDGEMENTS)
+        print(f"[{params}] {row['runs']} 次  分數 {row['score_mean']:.1f}±{row['score_stdev']:.1f} "
+              f"({row['score_min']}~{row['score_max']})  max combo {row['max_combo_mean']:.1f}  {dist}")
+    song_seconds = sum(r['song_time'] for r in results)
+    print(f"共 {len(results)} 次模擬，歌曲總長 {song_seconds:.0f} 秒，耗時 {elapsed:.1f} 秒"
+          f"（{song_seconds / max(elapsed, 1e-9):.0f} 倍速）")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'results': results, 'summary': summarize(results)}, f, indent=2)
+        print(f"結果已寫入 {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from sprite_blit import Sprite, blit
+
+
+def render_outlined_text(text, font, font_scale, color, thickness, outline_color, outline_thickness):
+    # 把描邊文字畫在透明底上，回傳 (Sprite, 從文字基準點到 sprite 左上角的位移)
+    # 黑底上的反鋸齒邊緣正好就是 premultiplied 的顏色，alpha 取自同樣畫法的遮罩
+    (w, h), baseline = measure_text(text, font, font_scale, outline_thickness)
+    pad = outline_thickness
+    size = (h + baseline + pad * 2, w + pad * 2)
+    origin = (pad, pad + h)
+    image = np.zeros(size + (3,), dtype=np.uint8)
+    mask = np.zeros(size, dtype=np.uint8)
+    cv2.putText(image, text, origin, font, font_scale, outline_color, outline_thickness, cv2.LINE_AA)
+    cv2.putText(image, text, origin, font, font_scale, color, thickness, cv2.LINE_AA)
+    cv2.putText(mask, text, origin, font, font_scale, 255, outline_thickness, cv2.LINE_AA)
+    cv2.putText(mask, text, origin, font, font_scale, 255, thickness, cv2.LINE_AA)
+    return Sprite(np.dstack([image, mask])), (-origin[0], -origin[1])
+
+
+@lru_cache(maxsize=1024)
+def measure_text(text, font, font_scale, thickness):
+    # cv2.getTextSize 的結果：((w, h), baseline)
+    return cv2.getTextSize(text, font, font_scale, thickness)
+
+
+@lru_cache(maxsize=256)
+def wrap_text(text, font, font_scale, thickness, max_width):
+    # 以空白斷詞，超過 max_width 就換行；單一個字太長時仍自成一行
+    lines = []
+    line = ''
+    for word in text.split(' '):
+        test_line = (line + ' ' + word).strip()
+        (w, _), _ = measure_text(test_line, font, font_scale, thickness)
+        if w > max_width and line != '':
+            lines.append(line)
+            line = word
+        else:
+            line = test_line
+    if line:
+        lines.append(line)
+    return tuple(lines)
+
+
+class TextCache:
+    """描邊文字的 sprite 快取：每種 (文字, 字型, 大小, 顏色, 描邊) 只畫一次，依 LRU 淘汰"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (Sprite, 位移)
+        self._lock = threading.RLock()
+
+    def sprite(self, text, font, font_scale, color, thickness=3, outline_color=(0, 0, 0), outline_thickness=6):
+        key = (text, font, font_scale, tuple(color), thickness, tuple(outline_color), outline_thickness)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            entry = render_outlined_text(text, font, font_scale, color, thickness, outline_color, outline_thickness)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return entry
+
+    def draw(self, img, text, pos, font, font_scale, color, thickness=3, outline_color=(0, 0, 0), outline_thickness=6):
+        # 與 cv2.putText 相同，pos 是文字左下角的基準點
+        sprite, (dx, dy) = self.sprite(text, font, font_scale, color, thickness, outline_color, outline_thickness)
+        return blit(img, sprite, pos[0] + dx, pos[1] + dy)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 所有遊戲共用的實例
+text_cache = TextCache()
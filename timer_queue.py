@@ -0,0 +1,30 @@
+import heapq
+import itertools
+
+
+class TimerQueue:
+    """以 heap 排序的計時器：每次只取出已經到期的項目，成本跟到期的數量有關，跟排了多少無關"""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()  # 同一時間到期時依加入的順序
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, when, item):
+        heapq.heappush(self._heap, (when, next(self._seq), item))
+
+    def pop_due(self, now):
+        # 依到期時間依序取出 when <= now 的 (when, item)；迴圈中新排進來又已到期的也會取出
+        # 不支援取消：呼叫端在 item 裡放版本號，過期的項目取出後自己略過
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            when, _, item = heapq.heappop(heap)
+            yield when, item
+
+    def next_due(self):
+        return self._heap[0][0] if self._heap else None
+
+    def clear(self):
+        self._heap.clear()
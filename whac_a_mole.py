@@ -6,6 +6,22 @@ import time
 import math
 from enum import Enum, auto
 from game_base import GameBase
+from asset_cache import assets
+from dirty_rects import DirtyRenderer
+from hit_test import HoleGrid
+from mole_board import board_background, board_scale, generate_positions, parse_board
+from sprite_blit import Sprite
+from text_cache import measure_text
+from sprite_anim import REVEAL_STEPS, reveal_frames, rotation_frames, swing_angles
+from timer_queue import TimerQueue
+
+HAMMER_SWING_MS = 200    # 揮一次槌子的時間
+HAMMER_SWING_FRAMES = 10
+HAMMER_SWING_ANGLE = -40  # cv2 的角度逆時針為正，負值往右下敲
+MOLE_FULL_MS = 1000       # 整隻露出來停留的時間
+SPAWN_INTERVAL_MS = 2000  # 經典 3x3 盤面每隔多久冒一批；洞越多間隔越短，前一批還在也照冒
+SPAWN_MIN_MS = 250
+SPAWN = -1                # 計時器裡代表「冒下一批」的項目，其他項目是洞的索引
 
 class GameMode(Enum):
     NONE = auto()
@@ -24,64 +40,113 @@ class MoleState(Enum):
     DISAPPEARING = 3
 
 class WhacAMole(GameBase):
-    def __init__(self):
+    def __init__(self, board='classic'):
         super().__init__("Whac-A-Mole")
         self.font = pygame.font.SysFont(None, 60)
-        pygame.mixer.init()  # 啟動音樂系統
-        pygame.mixer.music.load("whac_background_music.wav")  # 載入你的背景音樂檔
-        pygame.mixer.music.set_volume(0.4)  # 音量小一點比較不吵
-        pygame.mixer.music.play(-1)  # -1 代表無限循環
-        self.mode = GameMode.NONE
-        self.difficulty = Difficulty.NONE
-        self.state = "select_mode"
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()  # 啟動音樂系統；背景音樂在 resume() 才開始播
 
         self.mode_buttons = [(400, 300), (400, 400)]
         self.difficulty_buttons = [(400, 300), (400, 400)]
-        self.countdown_start = None
-        self.start_time = 0
 
-        self.positions = self.generate_positions()
-        self.moles = []
         self.mole_anim_duration = 500
 
-        self.score = 0
         self.high_score = 0
-        self.lives = 3
         self.duration = 60
-        self.victory = False
 
         self.mole_img = self.load_image("mole.png", (150, 150))
-        self.background = self.load_image("background.jpg", (1152, 768), color=(80, 80, 80))
+        self.base_background = self.load_image("background.jpg", (1152, 768), color=(80, 80, 80))
         self.hammer_img = self.load_image("hammer.png", (100, 100))
         self.heart_img = self.load_image("heart.png", (40, 40))
         self.bomb_img = self.load_image("bomb.png", (150, 150))
         self.menu_bg = self.load_image("menu_bg.png", (1152, 768), color=(120, 120, 120))
-        self.hammer_swinging = False
-        self.hammer_swing_time = 0
+        # 貼圖用的 sprite；揮槌動畫預先轉好每一格，執行時不做旋轉（探頭動畫跟著盤面在 set_board 建）
+        self.heart_sprite = Sprite(self.heart_img)
+        self.hammer_idle = rotation_frames(self.hammer_img, [0])[0]
+        self.hammer_swing = rotation_frames(self.hammer_img, swing_angles(HAMMER_SWING_FRAMES, HAMMER_SWING_ANGLE))
         self.mouse_x, self.mouse_y = 0, 0
+        self.compositor = DirtyRenderer()  # 遊戲畫面保留在這裡，每幀只重畫變動的區域
+        self.timers = TimerQueue()  # 地鼠狀態轉換與冒出的時間表，update 只處理到期的項目
 
         try:
-            self.hit_sound = pygame.mixer.Sound("hit.wav")
+            self.hit_sound = assets.load_sound("hit.wav")
         except:
             self.hit_sound = None
 
         try:
-            self.mole_hit_sound = pygame.mixer.Sound("bee.wav")
+            self.mole_hit_sound = assets.load_sound("bee.wav")
         except:
             self.mole_hit_sound = None
         try:
-            self.bomb_sound = pygame.mixer.Sound("bomb.wav")
+            self.bomb_sound = assets.load_sound("bomb.wav")
         except:
             self.bomb_sound = None
 
+        self.set_board(board)
+
+    def set_board(self, board):
+        # 換盤面（'large'、'5x7' 或 (rows, cols)）：洞口、背景、縮放後的探頭動畫與點擊索引都重建，回到選模式畫面
+        rows, cols = parse_board(board)
+        self.board = (rows, cols)
+        self.positions = generate_positions(rows, cols)
+        scale = board_scale(rows, cols)
+        self.background = board_background(self.base_background, self.positions, scale)
+        # 探頭動畫預先切成 REVEAL_STEPS 格；sprite 依洞距縮小
+        self.reveal = {kind: reveal_frames(self.scale_image(img, scale))
+                       for kind, img in (('mole', self.mole_img), ('bomb', self.bomb_img))}
+        self.hole_grid = self.build_hole_grid()
+        self.spawn_interval = max(SPAWN_MIN_MS, SPAWN_INTERVAL_MS * 9 // len(self.positions))
+        self.compositor.invalidate()
+        self.reset_session()
+
+    def reset_session(self):
+        # 每次從大廳進來都回到選模式畫面；high_score 與圖片音效保留
+        self.mode = GameMode.NONE
+        self.difficulty = Difficulty.NONE
+        self.state = "select_mode"
+        self.countdown_start = None
+        self.start_time = 0
+        self.score = 0
+        self.lives = 3
+        self.victory = False
+        self.hammer_swinging = False
+        self.hammer_swing_time = 0
+        self.moles = []
         for pos in self.positions:
             self.moles.append({
                 'pos': pos,
                 'state': MoleState.HIDDEN,
                 'start': 0,
                 'hit': False,
-                'type': 'mole'  # 新增 type 欄位
+                'type': 'mole',  # 新增 type 欄位
+                'gen': 0,  # 每次換狀態加一，計時器裡舊版本的項目就作廢
             })
+        self.spawn_gen = 0
+        self.clear_moles()
+
+    def clear_moles(self):
+        # 全部躲回洞裡，排好的計時器全部作廢
+        self.timers.clear()
+        for mole in self.moles:
+            mole['state'] = MoleState.HIDDEN
+            mole['hit'] = False
+            mole['gen'] += 1
+        self.active = set()                    # 露出來的洞（索引）
+        self.idle = list(range(len(self.moles)))  # 空著的洞，idle_slot 記每個洞在 idle 裡的位置
+        self.idle_slot = {i: i for i in self.idle}
+        self.spawn_gen += 1
+
+    def resume(self):
+        super().resume()
+        try:
+            pygame.mixer.music.load("whac_background_music.wav")  # 載入你的背景音樂檔
+            pygame.mixer.music.set_volume(0.4)  # 音量小一點比較不吵
+            pygame.mixer.music.play(-1)  # -1 代表無限循環
+        except pygame.error as e:
+            print(f"警告：背景音樂載入失敗: {e}")
+
+    def suspend(self):
+        pygame.mixer.music.stop()
 
     def draw_rounded_rect(self, img, top_left, bottom_right, radius, color, thickness=-1):
         x1, y1 = top_left
@@ -103,23 +168,21 @@ class WhacAMole(GameBase):
             cv2.ellipse(img, (x1 + radius, y2 - radius), (radius, radius), 90, 0, 90, color, thickness)
             cv2.ellipse(img, (x2 - radius, y2 - radius), (radius, radius), 0, 0, 90, color, thickness)
 
-    def generate_positions(self):
-        return [
-            (250, 180), (576, 180), (900, 180),
-            (250, 370), (576, 370), (900, 370),
-            (250, 570), (576, 570), (900, 570),
-        ]
-
     def load_image(self, path, size, color=(100, 100, 100)):
-        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        # BGRA 圖是 premultiplied alpha，sprite_blit 直接使用
+        img = assets.load_image(path, size, flags=cv2.IMREAD_UNCHANGED, premultiplied=True)
         if img is None:
             img = np.ones((size[1], size[0], 4), dtype=np.uint8)
             img[:, :, :3] = color
             img[:, :, 3] = 255
-        else:
-            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
         return img
 
+    def scale_image(self, img, scale):
+        if scale == 1.0:
+            return img
+        size = (max(1, round(img.shape[1] * scale)), max(1, round(img.shape[0] * scale)))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
     def draw_button(self, frame, text, rect, hover):
         x, y, w, h = rect
         color = (200, 200, 255) if hover else (255, 255, 255)
@@ -129,16 +192,30 @@ class WhacAMole(GameBase):
         text_y = y + (h + text_size[1]) // 2
         cv2.putText(frame, text, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
 
-    def rotate_image(self, image, angle):
-        (h, w) = image.shape[:2]
-        center = (w // 2, h // 2)
-        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-        rotated = cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=(0,0,0,0))
-        if image.shape[2] == 4:
-            alpha = image[:, :, 3]
-            alpha_rotated = cv2.warpAffine(alpha, M, (w, h))
-            rotated = np.dstack([rotated[:, :, :3], alpha_rotated])
-        return rotated
+    def build_hole_grid(self):
+        # 所有探頭動畫格的外框聯集，就是一個洞可能被點到的範圍
+        bounds = [anim.bounds(0, 0) for frames in self.reveal.values() for anim in frames if anim.sprite is not None]
+        return HoleGrid(self.positions, bounds[0].unionall(bounds))
+
+    def reveal_step(self, mole, now):
+        # 目前探頭到第幾格（0~REVEAL_STEPS）；躲在洞裡時回傳 None
+        progress = (now - mole['start']) / self.mole_anim_duration
+        if mole['state'] == MoleState.APPEARING:
+            ratio = min(progress, 1.0)
+        elif mole['state'] == MoleState.DISAPPEARING:
+            ratio = max(1.0 - progress, 0.0)
+        elif mole['state'] == MoleState.FULL:
+            ratio = 1.0
+        else:
+            return None
+        return int(ratio * REVEAL_STEPS)
+
+    def handle_event(self, event):
+        # 輸入佇列送來的滑鼠事件，轉回 OpenCV 的事件代碼交給 on_mouse_click
+        if event.type == pygame.MOUSEMOTION:
+            self.on_mouse_click(cv2.EVENT_MOUSEMOVE, event.pos[0], event.pos[1], 0, None)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.on_mouse_click(cv2.EVENT_LBUTTONDOWN, event.pos[0], event.pos[1], 0, None)
 
     def on_mouse_click(self, event, x, y, flags, param):
         self.mouse_x, self.mouse_y = x, y
@@ -165,8 +242,7 @@ class WhacAMole(GameBase):
                         self.score = 0
                         self.victory = False
                         self.countdown_start = time.time()
-                        for mole in self.moles:
-                            mole['state'] = MoleState.HIDDEN
+                        self.clear_moles()
 
                         self.countdown_start = time.time()
                         self.state = "countdown"
@@ -188,8 +264,7 @@ class WhacAMole(GameBase):
                     self.score = 0
                     self.lives = 3
                     self.victory = False
-                    for mole in self.moles:
-                        mole['state'] = MoleState.HIDDEN
+                    self.clear_moles()
 
                     self.countdown_start = time.time()
                     self.state = "countdown"
@@ -201,44 +276,36 @@ class WhacAMole(GameBase):
                 self.score = 0
                 self.lives = 3
                 self.victory = False
-                for mole in self.moles:
-                    mole['state'] = MoleState.HIDDEN
+                self.clear_moles()
 
         elif self.state == "game":
             self.hammer_swinging = True
             self.hammer_swing_time = pygame.time.get_ticks()
-            for mole in self.moles:
-                if mole['state'] in (MoleState.FULL, MoleState.DISAPPEARING, MoleState.APPEARING):
-                    # 計算目前地鼠露出高度區域
-                    x0, y0 = mole['pos']
-                    now = pygame.time.get_ticks()
-                    progress = (now - mole['start']) / self.mole_anim_duration
-                    if mole['state'] == MoleState.APPEARING:
-                        ratio = min(progress, 1.0)
-                    elif mole['state'] == MoleState.DISAPPEARING:
-                        ratio = max(1.0 - progress, 0.0)
-                    else:
-                        ratio = 1.0
-                    full_h = self.mole_img.shape[0]
-                    visible_h = int(full_h * ratio)
-                    h, w = visible_h, self.mole_img.shape[1]
-                    rect = pygame.Rect(x0 - w // 2, y0 - h, w, h)
-                    if rect.collidepoint(self.mouse_x, self.mouse_y) and not mole['hit']:
-                        mole['hit'] = True
-                        if mole.get('type') == 'bomb':
-                            self.score = max(0, self.score - 1)
-                            if self.mode == GameMode.DIFFICULTY and self.difficulty == Difficulty.HARD:
-                                self.lives -= 1
-                            if self.bomb_sound:
-                                self.bomb_sound.play()
-                        else:
-                            self.score += 1
-                            if self.mole_hit_sound:
-                                self.mole_hit_sound.play()
-
-                        if mole['state'] != MoleState.DISAPPEARING:
-                            mole['state'] = MoleState.DISAPPEARING
-                            mole['start'] = pygame.time.get_ticks()
+            now = pygame.time.get_ticks()
+            # 格狀索引找出滑鼠底下的洞，再用那一格動畫的 alpha 遮罩判定；點在透明的角落不算
+            for i in self.hole_grid.candidates(self.mouse_x, self.mouse_y):
+                mole = self.moles[i]
+                step = self.reveal_step(mole, now)
+                if step is None or mole['hit']:
+                    continue
+                x0, y0 = mole['pos']
+                if not self.reveal[mole['type']][step].hit(x0, y0, self.mouse_x, self.mouse_y):
+                    continue
+                mole['hit'] = True
+                if mole.get('type') == 'bomb':
+                    self.score = max(0, self.score - 1)
+                    if self.mode == GameMode.DIFFICULTY and self.difficulty == Difficulty.HARD:
+                        self.lives -= 1
+                    if self.bomb_sound:
+                        self.bomb_sound.play()
+                else:
+                    self.score += 1
+                    if self.mole_hit_sound:
+                        self.mole_hit_sound.play()
+
+                if mole['state'] != MoleState.DISAPPEARING:
+                    self.set_mole_state(i, MoleState.DISAPPEARING, now)
+                break  # 一槌只打一隻（最上層的那隻）
 
     def update(self):
         if self.state != "game":
@@ -246,45 +313,22 @@ class WhacAMole(GameBase):
 
         now = pygame.time.get_ticks()
 
-        if self.hammer_swinging and now - self.hammer_swing_time > 200:
+        if self.hammer_swinging and now - self.hammer_swing_time > HAMMER_SWING_MS:
             self.hammer_swinging = False
 
         if pygame.mouse.get_focused():
             self.mouse_x, self.mouse_y = pygame.mouse.get_pos()
 
-        active_count = 0
-
-        for mole in self.moles:
-            elapsed = now - mole['start']
-            if mole['state'] == MoleState.APPEARING and elapsed >= self.mole_anim_duration:
-                mole['state'] = MoleState.FULL
-                mole['start'] = now
-            elif mole['state'] == MoleState.FULL and elapsed >= 1000:
-                mole['state'] = MoleState.DISAPPEARING
-                mole['start'] = now
-            elif mole['state'] == MoleState.DISAPPEARING and elapsed >= self.mole_anim_duration:
-                mole['state'] = MoleState.HIDDEN
-                if not mole['hit'] and self.mode != GameMode.TIMER and mole.get('type') != 'bomb':
-                    self.lives -= 1
-                mole['hit'] = False
-
-            if mole['state'] in [MoleState.APPEARING, MoleState.FULL, MoleState.DISAPPEARING]:
-                active_count += 1
-
-        if active_count == 0:
-            count = 1 if self.mode == GameMode.DIFFICULTY and self.difficulty == Difficulty.EASY else random.randint(1,
-                                                                                                                     3)
-            for mole in self.moles:
-                mole['state'] = MoleState.HIDDEN
-            for mole in random.sample(self.moles, count):
-                mole['state'] = MoleState.APPEARING
-                mole['start'] = now
-                mole['hit'] = False
-                if self.mode == GameMode.TIMER or (
-                        self.mode == GameMode.DIFFICULTY and self.difficulty == Difficulty.HARD):
-                    mole['type'] = 'bomb' if random.random() < 0.3 else 'mole'
-                else:
-                    mole['type'] = 'mole'
+        # 只處理到期的計時器；被打中而提早換狀態的地鼠，舊的項目版本號對不上就略過
+        for when, (i, gen) in self.timers.pop_due(now):
+            if i == SPAWN:
+                if gen == self.spawn_gen:
+                    self.spawn_wave(when)
+            elif self.moles[i]['gen'] == gen:
+                self.advance_mole(i, when)
+        if not self.active:
+            # 盤面清空就不等計時器，馬上冒下一批
+            self.spawn_wave(now)
 
         if self.mode == GameMode.DIFFICULTY:
             if self.score >= 30:
@@ -301,14 +345,70 @@ class WhacAMole(GameBase):
                 if self.score > self.high_score:
                     self.high_score = self.score
 
-    def render(self, frame=None):
-        if frame is None:
-            frame = np.ones((600, 800, 3), dtype=np.uint8) * 30
+    def set_mole_state(self, i, state, when):
+        # 換狀態並排好這個狀態結束的時間；躲回洞裡的不用排
+        mole = self.moles[i]
+        mole['state'] = state
+        mole['start'] = when
+        mole['gen'] += 1
+        duration = {MoleState.APPEARING: self.mole_anim_duration, MoleState.FULL: MOLE_FULL_MS,
+                    MoleState.DISAPPEARING: self.mole_anim_duration}.get(state)
+        if duration is not None:
+            self.timers.schedule(when + duration, (i, mole['gen']))
+
+    def advance_mole(self, i, when):
+        # APPEARING -> FULL -> DISAPPEARING -> HIDDEN；沒被打到就躲回去的地鼠扣一條命
+        mole = self.moles[i]
+        if mole['state'] == MoleState.APPEARING:
+            self.set_mole_state(i, MoleState.FULL, when)
+        elif mole['state'] == MoleState.FULL:
+            self.set_mole_state(i, MoleState.DISAPPEARING, when)
+        elif mole['state'] == MoleState.DISAPPEARING:
+            self.set_mole_state(i, MoleState.HIDDEN, when)
+            if not mole['hit'] and self.mode != GameMode.TIMER and mole.get('type') != 'bomb':
+                self.lives -= 1
+            mole['hit'] = False
+            self.release_hole(i)
+
+    def spawn_wave(self, now):
+        # 從空著的洞隨機挑幾個冒出來，並排好下一批的時間
+        count = 1 if self.mode == GameMode.DIFFICULTY and self.difficulty == Difficulty.EASY else random.randint(1, 3)
+        for _ in range(min(count, len(self.idle))):
+            i = self.take_idle_hole()
+            mole = self.moles[i]
+            mole['hit'] = False
+            if self.mode == GameMode.TIMER or (
+                    self.mode == GameMode.DIFFICULTY and self.difficulty == Difficulty.HARD):
+                mole['type'] = 'bomb' if random.random() < 0.3 else 'mole'
+            else:
+                mole['type'] = 'mole'
+            self.set_mole_state(i, MoleState.APPEARING, now)
+        self.spawn_gen += 1
+        self.timers.schedule(now + self.spawn_interval, (SPAWN, self.spawn_gen))
+
+    def take_idle_hole(self):
+        # 隨機取一個空洞：和 idle 最後一個交換後 pop，O(1)
+        j = random.randrange(len(self.idle))
+        i, last = self.idle[j], self.idle[-1]
+        self.idle[j] = last
+        self.idle_slot[last] = j
+        self.idle.pop()
+        del self.idle_slot[i]
+        self.active.add(i)
+        return i
+
+    def release_hole(self, i):
+        self.active.discard(i)
+        self.idle_slot[i] = len(self.idle)
+        self.idle.append(i)
 
-        if self.state in ["select_mode", "select_difficulty", "end"]:
-            frame = self.menu_bg.copy()
-        else:
-            frame = self.background.copy()
+    def render(self, frame=None):
+        # 傳進來的 frame 用不到：每個畫面都從自己的背景開始畫
+        if self.state in ("countdown", "game"):
+            return self.render_play()
+        # 選單與結算畫面照舊整張重畫；回到遊戲畫面時再整張還原一次
+        self.compositor.invalidate()
+        frame = self.menu_bg.copy()
 
         if self.state == "select_mode":
 
@@ -361,52 +461,6 @@ class WhacAMole(GameBase):
 
                 cv2.putText(frame, label, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
 
-        elif self.state == "countdown":
-            seconds = int(5 - (time.time() - self.countdown_start))
-            if seconds <= 0:
-                self.start_time = time.time()
-                self.state = "game"
-            else:
-                cv2.putText(frame, str(seconds), (520, 400), cv2.FONT_HERSHEY_SIMPLEX, 4, (0, 0, 0), 5)
-
-        elif self.state == "game":
-            now = pygame.time.get_ticks()
-            for mole in self.moles:
-                x, y = mole['pos']
-                progress = (now - mole['start']) / self.mole_anim_duration
-                if mole['state'] == MoleState.APPEARING:
-                    ratio = min(progress, 1.0)
-                elif mole['state'] == MoleState.DISAPPEARING:
-                    ratio = max(1.0 - progress, 0.0)
-                elif mole['state'] == MoleState.FULL:
-                    ratio = 1.0
-                else:
-                    continue
-                full_h = self.mole_img.shape[0]
-                visible_h = int(full_h * ratio)
-                if visible_h > 0:
-                    img = self.bomb_img if mole.get('type') == 'bomb' else self.mole_img
-                    img_crop = img[0:visible_h, :, :]
-                    h, w = img_crop.shape[:2]
-                    top_left = (int(x - w / 2), int(y - h))
-                    frame = self.overlay_image(frame, img_crop, top_left)
-
-            cv2.putText(frame, f"Score: {self.score}", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 3)
-            if self.mode == GameMode.TIMER:
-                remaining = int(self.duration - (time.time() - self.start_time))
-                cv2.putText(frame, f"Time: {remaining}", (20, 90), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 3)
-                text = f"High Score: {self.high_score}"
-                text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.2, 3)[0]
-                x = frame.shape[1] - text_size[0] - 20  # 右邊往左推 20 px
-                y = 50
-                cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 3)
-
-            else:
-                for i in range(self.lives):
-                    x = 20 + i * 50  # 每顆愛心間距 50px
-                    y = 50
-                    frame = self.overlay_image(frame, self.heart_img, (x, y))
-
         elif self.state == "end":
             if self.mode == GameMode.DIFFICULTY and self.victory:
                 cv2.putText(frame, "Congratulations!", (330, 350), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 150, 0), 4)
@@ -426,28 +480,87 @@ class WhacAMole(GameBase):
             text_y = back_y + (back_h + text_size[1]) // 2
             cv2.putText(frame, "Back", (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
 
-        hammer_to_draw = self.rotate_image(self.hammer_img, -30) if self.hammer_swinging else self.hammer_img
-        h, w = hammer_to_draw.shape[:2]
-        top_left = (self.mouse_x - w // 2, self.mouse_y - h // 2)
-        frame = self.overlay_image(frame, hammer_to_draw, top_left)
+        with self.span("hammer"):
+            self.draw_cursor(frame)
 
         return frame
 
-    def overlay_image(self, background, overlay, position):
-        x, y = position
-        bh, bw = background.shape[:2]
-        oh, ow = overlay.shape[:2]
-        if x < 0 or y < 0 or x + ow > bw or y + oh > bh:
-            return background
-        if overlay.shape[2] == 4:
-            alpha = overlay[:, :, 3] / 255.0
-            for c in range(3):
-                background[y:y+oh, x:x+ow, c] = (
-                    (1 - alpha) * background[y:y+oh, x:x+ow, c] + alpha * overlay[:, :, c]
-                )
-        else:
-            background[y:y+oh, x:x+ow] = overlay[:, :, :3]
-        return background
+    def render_play(self):
+        # 倒數與遊戲畫面：列出這一幀要畫的物件，交給 DirtyRenderer 只重畫有變動的區域
+        items = []
+        if self.state == "countdown":
+            seconds = int(5 - (time.time() - self.countdown_start))
+            if seconds <= 0:
+                self.start_time = time.time()
+                self.state = "game"
+            else:
+                items.append(self.text_item('countdown', str(seconds), (520, 400), 4, 5))
 
-    def __del__(self):
-        pygame.mixer.music.stop()
\ No newline at end of file
+        if self.state == "game":
+            now = pygame.time.get_ticks()
+            with self.span("mole overlay"):
+                # 只看露出來的洞；依索引排序，下面一列蓋在上面一列上
+                for i in sorted(self.active):
+                    mole = self.moles[i]
+                    step = self.reveal_step(mole, now)
+                    if step is None:
+                        continue
+                    # 查表取出這一格，只畫露出洞口的部分
+                    anim = self.reveal[mole['type']][step]
+                    if anim.sprite is not None:
+                        x, y = mole['pos']
+                        items.append(self.sprite_item(('mole', i), anim, x, y))
+
+            items.append(self.text_item('score', f"Score: {self.score}", (20, 40), 1.2, 3))
+            if self.mode == GameMode.TIMER:
+                remaining = int(self.duration - (time.time() - self.start_time))
+                items.append(self.text_item('time', f"Time: {remaining}", (20, 90), 1.2, 3))
+                text = f"High Score: {self.high_score}"
+                (text_w, _), _ = measure_text(text, cv2.FONT_HERSHEY_SIMPLEX, 1.2, 3)
+                x = self.background.shape[1] - text_w - 20  # 右邊往左推 20 px
+                items.append(self.text_item('high_score', text, (x, 50), 1.2, 3))
+            elif self.lives > 0:
+                # 每顆愛心間距 50px
+                positions = [(20 + i * 50, 50) for i in range(self.lives)]
+                rect = pygame.Rect(20, 50, (self.lives - 1) * 50 + self.heart_sprite.w, self.heart_sprite.h)
+                items.append(('lives', self.lives, rect,
+                              lambda canvas: self.blit_sprites(canvas, self.heart_sprite, positions)))
+
+        # 槌子游標最後畫
+        anim = self.hammer_frame(pygame.time.get_ticks())
+        if anim.sprite is not None:
+            items.append(self.sprite_item('cursor', anim, self.mouse_x, self.mouse_y))
+        with self.span("composite"):
+            return self.compositor.render(self.background, items)
+
+    def sprite_item(self, key, anim, x, y):
+        # DirtyRenderer 的物件：動畫的一格畫在錨點 (x, y)
+        pos = (x + anim.dx, y + anim.dy)
+        return key, anim, anim.bounds(x, y), lambda canvas: self.blit_sprites(canvas, anim.sprite, [pos])
+
+    def text_item(self, key, text, org, scale, thickness, color=(0, 0, 0)):
+        # DirtyRenderer 的物件：cv2.putText 的文字，外框含筆畫粗細與基準線以下的部分
+        (w, h), baseline = measure_text(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        rect = pygame.Rect(org[0] - thickness, org[1] - h - thickness, w + 2 * thickness, h + baseline + 2 * thickness)
+        return key, text, rect, lambda canvas: cv2.putText(canvas, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color,
+                                                           thickness)
+
+    def draw_perf_overlay(self, frame):
+        # 效能面板直接畫在保留的 canvas 上，下一幀要把那一塊還原
+        if self.profiler.overlay_enabled and frame is self.compositor.canvas:
+            self.compositor.invalidate(self.profiler.panel_rect(frame))
+        return super().draw_perf_overlay(frame)
+
+    def hammer_frame(self, now):
+        # 目前槌子的那一格：沒在揮就是靜止的槌子，揮動中依經過時間查表
+        if not self.hammer_swinging:
+            return self.hammer_idle
+        elapsed = max(now - self.hammer_swing_time, 0)
+        index = min(elapsed * len(self.hammer_swing) // HAMMER_SWING_MS, len(self.hammer_swing) - 1)
+        return self.hammer_swing[index]
+
+    def draw_cursor(self, frame):
+        # 最後一步：槌子游標疊在所有東西上面
+        anim = self.hammer_frame(pygame.time.get_ticks())
+        if anim.sprite is not None:
+            self.blit_sprites(frame, anim.sprite, [(self.mouse_x + anim.dx, self.mouse_y + anim.dy)])